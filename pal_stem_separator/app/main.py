@@ -5,39 +5,39 @@ import datetime
 import sys
 import os
 import torch
-import struct
 import logging
 import threading
 import queue
 import libtmux
-from typing import Protocol, Self, Callable, Dict
+from typing import Protocol, Self, Callable, Dict, Optional
 import dataclasses
 import json
 
 from pal_stem_separator.stream_separator_args import Args
-from pal_stem_separator.stream_separator_utils import expand_path
 from pal_stem_separator.ui.stream_separator_ui import run_gui, run_tui
 from pal_stem_separator.chunk import Chunk
 from pal_stem_separator.stats import Stats, IntSum, FloatSum, FloatLast
 from pal_stem_separator.buffer_hs_tasnet import BufferHSTasNet, SampleSpec
+from pal_stem_separator.onnx_hs_tasnet import OnnxHSTasNet
 from pal_stem_separator import export_executorch
 
+def clear_queue(q):
+    """Drop everything in a queue.Queue under a single lock acquisition.
+
+    Threads blocked in get() keep waiting on the same queue, so this is safe
+    where swapping in a fresh queue would strand them.
+    """
+    with q.mutex:
+        q.queue.clear()
+        q.not_full.notify_all()
+
 def check_and_empty_queues(args, input_queue, output_queue):
     """Check if queue emptying was requested and empty queues if needed."""
 
     if args.empty_queues_requested and args.empty_queues_requested != args.queues_last_emptied_at:
         # Empty both queues
-        while not input_queue.empty():
-            try:
-                input_queue.get_nowait()
-            except:
-                break
-        
-        while not output_queue.empty():
-            try:
-                output_queue.get_nowait()
-            except:
-                break
+        clear_queue(input_queue)
+        clear_queue(output_queue)
         
         # Update the timestamp
         args.queues_last_emptied_at = args.empty_queues_requested
@@ -47,39 +47,72 @@ def check_and_empty_queues(args, input_queue, output_queue):
         return True
     return False
 
+def stage_to_device(audio_tensor, device, copy_stream):
+    """Start copying a chunk to the GPU on a side stream.
+
+    Returns the device tensor and an event marking the end of the copy, so the
+    transfer of the next chunk overlaps with inference on the current one.
+    """
+    pinned = audio_tensor.pin_memory()
+    with torch.cuda.stream(copy_stream):
+        device_tensor = pinned.to(device, non_blocking=True)
+        ready = torch.cuda.Event()
+        ready.record(copy_stream)
+    return device_tensor, ready
+
+def max_chunk_len(args, sample_spec):
+    """Longest per-channel chunk audio_input_thread reads for these settings, overlap included."""
+    secs = args.chunk_secs + args.overlap_secs
+    # Mirrors the reads below: num_bytes is passed as the sample count, plus the overlap prefix
+    return sample_spec.secs_to_bytes(secs) // sample_spec.channels + sample_spec.secs_to_samples(args.overlap_secs)
+
 def audio_input_thread(input_queue, stats_queue, sample_spec):
     try:
         last_input_audio_tensor = None
+        copy_stream = None
         while True:
             args = Args.get_live()
 
-            # Read chunk from stdin
             secs = args.chunk_secs + args.overlap_secs
             num_samples = sample_spec.secs_to_samples(secs)
             num_bytes = sample_spec.secs_to_bytes(secs)
-            input_audio_tensor = sample_spec.read_chunk(sys.stdin.buffer, num_bytes)
-            if input_audio_tensor is None:
-                break
 
             # If not the first chunk, add the overlap from the end of the last chunk
             # This avoids the artefacts and popping we get at the edges of chunks
             # We drop these segments after processing before output
             remove_overlap_start = 0.0
             remove_overlap_end = args.overlap_secs
+            overlap_segment = None
             if last_input_audio_tensor is not None and args.overlap_secs > 0:
                 remove_overlap_start = args.overlap_secs
                 overlap_samples_per_channel = sample_spec.secs_to_samples(args.overlap_secs)
                 overlap_segment = last_input_audio_tensor[:, -overlap_samples_per_channel:]
-                logging.debug(f"Before overlap: {input_audio_tensor.shape}")
-                input_audio_tensor = torch.cat((overlap_segment, input_audio_tensor), dim=-1)
-                logging.debug(f"Added overlap of {overlap_samples_per_channel} samples from last chunk")
+
+            # Read chunk from stdin, converting it straight in after the overlap
+            input_audio_tensor = sample_spec.read_chunk(sys.stdin.buffer, num_bytes, prefix=overlap_segment)
+            if input_audio_tensor is None:
+                break
+            if overlap_segment is not None:
+                logging.debug("Added overlap of %d samples from last chunk", overlap_segment.shape[-1])
             last_input_audio_tensor = input_audio_tensor
 
+            # Off the inference thread, and before the tensor moves to the GPU
+            input_rms = rms(input_audio_tensor) if args.normalize else None
+
+            input_ready_event = None
+            device = torch.device(args.device)
+            if device.type == "cuda" and torch.cuda.is_available():
+                if copy_stream is None:
+                    copy_stream = torch.cuda.Stream(device)
+                input_audio_tensor, input_ready_event = stage_to_device(input_audio_tensor, device, copy_stream)
+
             input_queue.put(
                 Chunk(sample_spec=sample_spec,
                       input_audio_tensor=input_audio_tensor,
                       remove_overlap_start=remove_overlap_start,
-                      remove_overlap_end=remove_overlap_end))
+                      remove_overlap_end=remove_overlap_end,
+                      input_ready_event=input_ready_event,
+                      input_rms=input_rms))
 
             stats_queue.put(Stats.create(
                 input_bytes=IntSum(num_bytes),
@@ -93,18 +126,38 @@ def audio_input_thread(input_queue, stats_queue, sample_spec):
 def audio_inference_thread(input_queue, output_queue, stats_queue, sample_spec):
     loaded_checkpoint = None
     loaded_device = None
+    loaded_onnx = None
+    loaded_torch_jit = None
+    loaded_quantize = None
 
     def reload_device(args):
         device = torch.device(args.device)
         logging.info(f"Using device: {device}")
         return device
 
+    def should_quantize(args):
+        # Dynamically quantized modules only have CPU kernels
+        return args.quantize and not args.onnx and torch.device(args.device).type == "cpu"
+
     def reload_model(args):
         logging.info("Loading HS-TasNet model...")
         model = BufferHSTasNet(sample_spec)
-        checkpoint_path = expand_path(args.checkpoint)
+        checkpoint_path = args.expanded_checkpoint
         model.load(checkpoint_path)
         logging.info(f"Checkpoint {checkpoint_path} loaded successfully")
+        if args.onnx:
+            logging.info("Using ONNX Runtime for inference")
+            # Exported (or loaded from cache) when moved to the device, for the longest chunk
+            model = OnnxHSTasNet(model, checkpoint_path, max_chunk_len(args, sample_spec))
+            return model
+        if should_quantize(args):
+            logging.info("Quantizing Linear/LSTM weights to int8 for CPU inference")
+            model.eval()
+            torch.ao.quantization.quantize_dynamic(
+                model, {torch.nn.Linear, torch.nn.LSTM}, dtype=torch.qint8, inplace=True)
+        if args.torch_jit:
+            logging.info("Using torch.jit tracing for inference")
+            model.jit_trace = True
         return model
 
     device = None
@@ -124,9 +177,17 @@ def audio_inference_thread(input_queue, output_queue, stats_queue, sample_spec):
             loaded_device = args.device
             move_model = True
 
-        if expand_path(args.checkpoint) != loaded_checkpoint:
+        if (args.expanded_checkpoint != loaded_checkpoint
+                or args.onnx != loaded_onnx
+                or args.torch_jit != loaded_torch_jit
+                or should_quantize(args) != loaded_quantize
+                # Re-export once the settings make chunks longer than the ONNX graph takes
+                or (isinstance(model, OnnxHSTasNet) and model.max_len < max_chunk_len(args, sample_spec))):
             model = reload_model(args)
-            loaded_checkpoint = expand_path(args.checkpoint)
+            loaded_checkpoint = args.expanded_checkpoint
+            loaded_onnx = args.onnx
+            loaded_torch_jit = args.torch_jit
+            loaded_quantize = should_quantize(args)
             move_model = True
 
         if move_model:
@@ -134,15 +195,25 @@ def audio_inference_thread(input_queue, output_queue, stats_queue, sample_spec):
             move_model = False
 
         chunk = input_queue.get()
+        if chunk.input_ready_event is not None:
+            # Wait for the input thread's async copy before using the tensor here
+            compute_stream = torch.cuda.current_stream()
+            if isinstance(model, OnnxHSTasNet):
+                # ONNX Runtime reads the buffer on its own CUDA stream, which a
+                # wait on torch's stream wouldn't order, so wait on the host
+                chunk.input_ready_event.synchronize()
+            else:
+                compute_stream.wait_event(chunk.input_ready_event)
+            chunk.input_audio_tensor.record_stream(compute_stream)
 
         logging.debug("Starting model processing...")
-        process_chunk(args, model, chunk)
+        with torch.inference_mode():
+            process_chunk(args, model, chunk)
         logging.debug("Model processing complete, queueing output...")
 
-        # Queue processed audio for output thread
-        # We queue this up in frames of the PA buffer size
-        # TODO: move this work out of the inference thread
-        queue_output_chunk(chunk, sample_spec.channels, sample_spec.bits, output_queue)
+        # Hand the float audio to the output thread, which does the PCM
+        # conversion so that overlaps with inference on the next chunk
+        output_queue.put(chunk)
         logging.debug("Output queued, continuing loop...")
 
 def audio_output_thread(output_queue, stats_queue, sample_spec):
@@ -155,29 +226,29 @@ def audio_output_thread(output_queue, stats_queue, sample_spec):
     try:
         while True:
             try:
-                chunk_or_data = output_queue.get()
-                if isinstance(chunk_or_data, Chunk):
-                    logging.debug("Chunk completed")
-                    chunk_or_data.output_completed_at = datetime.datetime.now()
-                    chunk_or_data.log_timing()
-
-                    stats_queue.put(Stats.create(
-                        latency_secs=FloatLast(chunk_or_data.latency_secs),
-                        processed_bytes=FloatSum(sample_spec.secs_to_bytes(chunk_or_data.processed_duration_secs)),
-                        processed_samples=FloatSum(sample_spec.secs_to_samples(chunk_or_data.processed_duration_secs)),
-                        processed_secs=FloatSum(chunk_or_data.processed_duration_secs),
-                        output_bytes=FloatSum(sample_spec.secs_to_bytes(chunk_or_data.truncated_duration_secs)),
-                        output_samples=FloatSum(sample_spec.secs_to_samples(chunk_or_data.truncated_duration_secs)),
-                        output_secs=FloatSum(chunk_or_data.truncated_duration_secs)))
-
-                    continue
-
-                # Write to stdout
-                sys.stdout.buffer.write(chunk_or_data)
+                chunk = output_queue.get()
+                encode_output_chunk(chunk, sample_spec.channels, sample_spec.bits)
+
+                # Write to stdout, flushing once per chunk rather than per write
+                for data in chunk.output_buffers:
+                    sys.stdout.buffer.write(data)
+
+                    # Rate limit to match PulseAudio's expected timing
+                    #time.sleep(buffer_duration)
                 sys.stdout.buffer.flush()
-                
-                # Rate limit to match PulseAudio's expected timing
-                #time.sleep(buffer_duration)
+
+                logging.debug("Chunk completed")
+                chunk.output_completed_at = datetime.datetime.now()
+                chunk.log_timing()
+
+                stats_queue.put(Stats.create(
+                    latency_secs=FloatLast(chunk.latency_secs),
+                    processed_bytes=FloatSum(sample_spec.secs_to_bytes(chunk.processed_duration_secs)),
+                    processed_samples=FloatSum(sample_spec.secs_to_samples(chunk.processed_duration_secs)),
+                    processed_secs=FloatSum(chunk.processed_duration_secs),
+                    output_bytes=FloatSum(sample_spec.secs_to_bytes(chunk.truncated_duration_secs)),
+                    output_samples=FloatSum(sample_spec.secs_to_samples(chunk.truncated_duration_secs)),
+                    output_secs=FloatSum(chunk.truncated_duration_secs)))
                 
             except queue.Empty:
                 # Check if we should continue (main thread sets a flag)
@@ -194,22 +265,24 @@ def stats_output_thread(stats_queue):
     while True:
         args = Args.get_live()
         try:
-            logging.debug(f"stats: {stats}")
+            logging.debug("stats: %s", stats)
             new_stats = stats_queue.get()
-            logging.debug(f"mappending stats: {new_stats}")
+            logging.debug("mappending stats: %s", new_stats)
             stats = stats.mappend(new_stats)
-            logging.debug(f"stats: {new_stats}")
+            logging.debug("stats: %s", new_stats)
             stats.save(args)
         except queue.Empty:
             continue
 
     logging.info("Stats thread stopping")
 
-def queue_output_chunk(chunk, channels, bits, output_queue):
-    """Convert processed audio tensor to bytes and queue for output."""
+# The mixed audio is an inference tensor, so it can only be modified in place under inference mode
+@torch.inference_mode()
+def encode_output_chunk(chunk, channels, bits):
+    """Convert processed audio tensor to PA-buffer-sized PCM byte views on the chunk."""
     chunk.output_started_at = datetime.datetime.now()
     audio_tensor = chunk.truncated_audio_tensor
-    logging.debug(f"queue_output_chunk input shape: {audio_tensor.shape}")
+    logging.debug("encode_output_chunk input shape: %s", audio_tensor.shape)
 
     # Ensure tensor is on CPU and in correct format
     if audio_tensor.is_cuda:
@@ -224,44 +297,39 @@ def queue_output_chunk(chunk, channels, bits, output_queue):
         raise ValueError(f"Wrong number of channels in output: {audio_tensor.shape[0]}")
 
     # Ensure audio is properly bounded and convert to correct format
-    audio_clamped = torch.clamp(audio_tensor, -1.0, 1.0)
+    # In place, since the mixed tensor isn't used again after encoding
+    audio_clamped = audio_tensor.clamp_(-1.0, 1.0)
 
     # Convert to integer format using proper audio quantization
     if bits == 16:
         # Convert to 16-bit PCM using torchaudio's proper quantization
-        audio_int = (audio_clamped * 32767).round().to(torch.int16).numpy()
+        audio_int = audio_clamped.mul_(32767).round_().to(torch.int16).numpy()
     elif bits == 32:
-        audio_int = (audio_clamped * 2147483647).round().to(torch.int32).numpy()
+        audio_int = audio_clamped.mul_(2147483647).round_().to(torch.int32).numpy()
     else:
         raise ValueError(f"Unsupported bit depth: {bits}")
 
-    logging.debug(f"Converted audio range: [{audio_int.min()}, {audio_int.max()}]")
+    # Avoid full reductions over the chunk unless they'll actually be logged
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("Converted audio range: [%d, %d]", audio_int.min(), audio_int.max())
 
-    # Convert to buffer-sized chunks and queue them
+    # Split into chunks of a few PA buffers each, one write per chunk
     buffer_size = int(os.environ.get('PA_LAMBDA_BUFFER_SIZE', '1024'))
+    buffers_per_write = int(os.environ.get('PA_LAMBDA_BUFFERS_PER_WRITE', '4'))
     samples_per_buffer = buffer_size # 1024 samples per buffer
     total_samples = audio_int.shape[-1]
-    format_char = 'h' if bits == 16 else 'i'
-
-    logging.debug(f"Queueing {total_samples} samples in {samples_per_buffer}-sample buffers")
+    bytes_per_write = samples_per_buffer * buffers_per_write * channels * (bits // 8)
 
-    for start_sample in range(0, total_samples, samples_per_buffer):
-        end_sample = min(start_sample + samples_per_buffer, total_samples)
+    logging.debug("Encoding %d samples in %d-sample buffers", total_samples, samples_per_buffer)
 
-        # Extract buffer-sized chunk
-        if channels == 2 and audio_int.shape[0] == 2:
-            # [[L L], [R R]] -> get samples [start:end] -> interleave to [L R L R]
-            segment = audio_int[:, start_sample:end_sample].T.flatten()
-        else:
-            segment = audio_int[start_sample:end_sample]
+    # Interleave the whole chunk once: [[L L], [R R]] -> [L R L R]
+    # Then hand out zero-copy views of write-sized byte ranges
+    interleaved = memoryview(audio_int.T.astype(f'<i{bits // 8}', copy=False).tobytes())
+    chunk.output_buffers = [
+        interleaved[start:start + bytes_per_write]
+        for start in range(0, len(interleaved), bytes_per_write)]
 
-        # Pack only this small chunk and queue it
-        segment_data = struct.pack(f'<{len(segment)}{format_char}', *segment)
-        output_queue.put(segment_data)
-
-    output_queue.put(chunk)  # Indicate chunk is fully queued
-
-    logging.debug(f"Finished queueing {total_samples} samples")
+    logging.debug("Finished encoding %d samples", total_samples)
 
 
 def apply_gain(tensor, gain_db):
@@ -270,6 +338,19 @@ def apply_gain(tensor, gain_db):
     return tensor * (gain_db / 100.0)
     #return torchaudio.functional.gain(tensor, gain_db)
 
+@torch.jit.script
+def mix_stems(stems: torch.Tensor, gains: torch.Tensor, original_rms: Optional[torch.Tensor]) -> torch.Tensor:
+    """Scale each stem by its percent gain and sum them, matching original_rms if given."""
+    mixed = (stems * (gains / 100.0).view(-1, 1, 1)).sum(dim=0)
+    if original_rms is not None:
+        mixed_rms = torch.sqrt(torch.mean(mixed ** 2))
+        if bool(mixed_rms > 0):
+            mixed = mixed * (original_rms / mixed_rms)
+    return mixed
+
+def rms(tensor):
+    return torch.sqrt(torch.mean(tensor ** 2))
+
 def log_stem_range(stems, names, label):
     for name, stem in zip(names, stems):
         logging.debug(f"{name} range {label}: [{stem.min().item():.3f}, {stem.max().item():.3f}]")
@@ -283,48 +364,34 @@ def process_chunk(args, model, chunk):
 
     chunk.processed_audio_tensor = model.process_audio_tensor(chunk.input_audio_tensor)
     separated_audios = chunk.processed_audio_tensor
-    logging.debug(f"Got processed stems: {separated_audios.shape}")
+    logging.debug("Got processed stems: %s", separated_audios.shape)
 
     # Drop the overlap segment at the start and end if present
     if chunk.remove_overlap_start + chunk.remove_overlap_end > 0:
         overlap_samples_start = chunk.sample_spec.secs_to_samples_1ch(chunk.remove_overlap_start)
         overlap_samples_end = chunk.sample_spec.secs_to_samples_1ch(chunk.remove_overlap_end)
         separated_audios = separated_audios[:, :, overlap_samples_start:-overlap_samples_end]
-        logging.debug(f"Dropped {overlap_samples_start + overlap_samples_end} samples of overlap, new shape: {separated_audios.shape}")
+        logging.debug("Dropped %d samples of overlap, new shape: %s", overlap_samples_start + overlap_samples_end, separated_audios.shape)
 
-    # Extract stems: (batch, 4, channels, samples)
-    drums = separated_audios[0, :, :]
-    bass = separated_audios[1, :, :] # swapped?
-    vocals = separated_audios[2, :, :] # swapped?
-    other = separated_audios[3, :, :]
-    
-    # Apply volume controls using proper audio gain
+    # Stems: (4, channels, samples) as drums, bass, vocals, other
+    stems = separated_audios[:4]
+
+    # Apply volume controls, mix stems back together and normalize if enabled
     gains = args.get_effective_gains()
-    logging.debug(f"Applying effective gain transform: {gains}")
-    log_stem_ranges(drums, bass, vocals, other, "before")
-    drums = apply_gain(drums, gains[0])
-    bass = apply_gain(bass, gains[1])
-    vocals = apply_gain(vocals, gains[2])
-    other = apply_gain(other, gains[3])
-    log_stem_ranges(drums, bass, vocals, other, "after")
+    logging.debug("Applying effective gain transform: %s", gains)
+    gains_tensor = torch.as_tensor(gains, dtype=stems.dtype, device=stems.device)
+    # Each range is a full reduction plus a device sync, so only compute them when logged
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        log_stem_ranges(*stems, "before")
+        log_stem_ranges(*apply_gain(stems, gains_tensor.view(-1, 1, 1)), "after")
     chunk.gains_applied = gains
-    
-    # Mix stems back together with proper audio mixing (sum and normalize)
-    mixed = drums + bass + vocals + other
-    logging.debug(f"Mixed: peak={torch.max(torch.abs(mixed)):.3f}, samples={mixed.shape[-1] if len(mixed.shape) > 0 else 0}")
-
-    # Apply normalization if enabled
-    if args.normalize and torch.max(torch.abs(mixed)) > 0:
-        # Calculate RMS of original input
-        original_rms = torch.sqrt(torch.mean(chunk.input_audio_tensor ** 2))
-        # Calculate RMS of mixed output
-        mixed_rms = torch.sqrt(torch.mean(mixed ** 2))
-        
-        if mixed_rms > 0:
-            # Calculate normalization factor to match original intensity
-            normalization_factor = original_rms / mixed_rms
-            mixed = mixed * normalization_factor
-            logging.debug(f"Normalized: original_rms={original_rms:.6f}, mixed_rms={mixed_rms:.6f}, factor={normalization_factor:.3f}")
+    original_rms = None
+    if args.normalize:
+        # Usually precomputed by the input thread, unless normalize was just switched on
+        original_rms = chunk.input_rms if chunk.input_rms is not None else rms(chunk.input_audio_tensor)
+    mixed = mix_stems(stems, gains_tensor, original_rms)
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("Mixed: peak=%.3f, samples=%d", mixed.abs().max().item(), mixed.shape[-1] if len(mixed.shape) > 0 else 0)
 
     chunk.processing_completed_at = datetime.datetime.now()
     chunk.truncated_audio_tensor = mixed
@@ -378,6 +445,16 @@ def main():
 
     sample_spec = SampleSpec.from_env()
 
+    # Leave cores free for the audio I/O threads rather than letting torch take them all
+    num_threads = int(os.environ.get('PA_LAMBDA_TORCH_THREADS', max(1, (os.cpu_count() or 1) - 2)))
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError as e:
+        # Only allowed before any inter-op parallel work has started
+        logging.warning(f"Could not set torch inter-op threads: {e}")
+    logging.info(f"Using {num_threads} torch intra-op threads")
+
     # Set up audio output queue and thread
     input_queue = queue.Queue()
     output_queue = queue.Queue()
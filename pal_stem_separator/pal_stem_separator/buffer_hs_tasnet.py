@@ -1,24 +1,65 @@
 import torch
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import os
 import logging
-import struct
 import sys
 import torchaudio
 from torchaudio.functional import resample
-from einops import rearrange, repeat, reduce
+from einops import rearrange, reduce
 from hs_tasnet import HSTasNet
-import numpy as np
 
 def round_down_to_multiple(num, mult):
     return (num // mult) * mult
 
+def prepare_input(audio_tensor, segment_len, device, stereo, auto_convert_to_stereo=True):
+   """Shape a (channels, samples) chunk into a model input on device.
+
+   Returns the input and whether it was expanded from mono, for finish_output.
+   """
+   # curtail to divisible segment lens
+
+   audio_len = audio_tensor.shape[-1]
+   rounded_down_len = round_down_to_multiple(audio_len, segment_len)
+
+   audio_tensor = audio_tensor[..., :rounded_down_len]
+
+   # add batch
+   audio_tensor = rearrange(audio_tensor, '... -> 1 ...')
+
+   # move before any mono to stereo so only one channel is transferred
+   audio_tensor = audio_tensor.to(device)
+
+   # maybe mono to stereo
+   # expand is a stride trick, so the channel is duplicated without a copy
+   mono_to_stereo = stereo and auto_convert_to_stereo and audio_tensor.shape[1] == 1
+   if mono_to_stereo:
+      logging.debug("Converting mono to stereo by duplicating channel")
+      audio_tensor = audio_tensor.expand(-1, 2, -1)
+
+   return audio_tensor, mono_to_stereo
+
+def finish_output(transformed, mono_to_stereo):
+   """Undo prepare_input's batching and mono expansion on the separated stems."""
+   # remove batch
+
+   transformed = rearrange(transformed, '1 ... -> ...')
+
+   # maybe stereo to mono
+
+   if mono_to_stereo:
+      transformed = reduce(transformed, 's n -> 1 n', 'mean')
+
+   return transformed
+
 @dataclass
 class SampleSpec:
    sample_rate: int
    channels: int
    bits: int
 
+   # Reused across reads so each chunk doesn't allocate a fresh bytes object
+   _read_buffer: bytearray = field(default_factory=bytearray, init=False, repr=False, compare=False)
+
    @classmethod
    def from_env(cls):
       r = cls(
@@ -51,55 +92,73 @@ class SampleSpec:
    def stereo(self):
       return self.channels == 2
 
-   def read_chunk(self, buf, num_samples):
-      """Read a chunk of audio from stdin and convert to torch tensor format."""
+   def read_chunk(self, buf, num_samples, prefix=None):
+      """Read a chunk of audio from stdin and convert to torch tensor format.
+
+      If given, the (channels, samples) prefix is placed before the new audio in
+      the same allocation, saving a separate concatenation.
+      """
       try:
          chunk_bytes = num_samples * self.bytes_per_sample
-         logging.debug(f"Attempting to read {chunk_bytes} bytes ({num_samples} samples at {self.bytes_per_sample} bytes/sample)")
-         data = buf.read(chunk_bytes)
-         logging.debug(f"Read {len(data) if data else 0} bytes")
-         if not data:
+         logging.debug("Attempting to read %d bytes (%d samples at %d bytes/sample)", chunk_bytes, num_samples, self.bytes_per_sample)
+         if len(self._read_buffer) != chunk_bytes:
+               self._read_buffer = bytearray(chunk_bytes)
+         view = memoryview(self._read_buffer)
+         read_bytes = 0
+         while read_bytes < chunk_bytes:
+               n = buf.readinto(view[read_bytes:])
+               if not n:
+                     break
+               read_bytes += n
+         logging.debug("Read %d bytes", read_bytes)
+         if read_bytes == 0:
                return None
 
          # Handle partial reads - pad with zeros if needed
-         if len(data) < chunk_bytes:
-               data += b'\x00' * (chunk_bytes - len(data))
+         if read_bytes < chunk_bytes:
+               view[read_bytes:] = bytes(chunk_bytes - read_bytes)
 
-         # Convert bytes to numpy array based on bit depth
+         # Reinterpret the raw little-endian PCM directly as a tensor
          if self.bits == 16:
-               dtype = np.int16
-               format_char = 'h'
+               dtype = torch.int16
          elif self.bits == 32:
-               dtype = np.int32
-               format_char = 'i'
+               dtype = torch.int32
          else:
                raise ValueError(f"Unsupported bit depth: {self.bits}")
-
-         # Unpack bytes to samples
-         num_samples = len(data) // self.bytes_per_sample
-         samples = struct.unpack(f'<{num_samples}{format_char}', data)
-
-         audio_np = np.array(samples, dtype=dtype)
+         samples = torch.frombuffer(self._read_buffer, dtype=dtype)
 
          # Reshape to (channels, samples) - torchcodec/torchaudio format
-         if self.stereo:
-               # Interleaved stereo: L R L R -> [[L L], [R R]]
-               audio_np = audio_np.reshape(-1, 2).T
-         else:
-               audio_np = audio_np.reshape(1, -1)
+         # Interleaved stereo: L R L R -> [[L L], [R R]]
+         audio_tensor = samples.view(-1, self.channels).t()
 
-         # Normalize to [-1, 1] and convert to torch tensor (proper format)
+         # Normalize to [-1, 1] in a single float allocation
+         # This copy also detaches the tensor from the reused read buffer
          max_val = 2**(self.bits-1)
-         audio_float = audio_np.astype(np.float32) / max_val
-         audio_tensor = torch.from_numpy(audio_float)
+         prefix_len = 0 if prefix is None else prefix.shape[-1]
+         out = torch.empty((self.channels, prefix_len + audio_tensor.shape[-1]), dtype=torch.float32)
+         if prefix is not None:
+               out[:, :prefix_len].copy_(prefix)
+         out[:, prefix_len:].copy_(audio_tensor).mul_(1.0 / max_val)
 
-         return audio_tensor
+         return out
 
       except Exception as e:
          logging.error(f"Error reading audio chunk: {e}")
          return None
 
 
+class _SeparationOnly(torch.nn.Module):
+   """Expose only the separated stems so the graph has a single output."""
+
+   def __init__(self, model):
+      super().__init__()
+      self.model = model
+
+   def forward(self, audio):
+      transformed, _ = self.model(audio)
+      return transformed
+
+
 class BufferHSTasNet(HSTasNet):
    """Variant of HSTasNet with a method to process audio from a BytesIO."""
 
@@ -109,6 +168,25 @@ class BufferHSTasNet(HSTasNet):
          sample_rate=self.sample_spec.sample_rate,
          stereo=(self.sample_spec.channels == 2),
          *args, **kwargs)
+      # If set, inference runs through a traced module instead of eager forward
+      self.jit_trace = False
+      # ((shape, device), module) of the last trace, kept out of the module tree
+      self.__dict__['_traced'] = None
+
+   def _traced_forward(self, audio_tensor):
+      """Run a traced forward, re-tracing whenever the input shape or device changes.
+
+      Tracing bakes in shape arithmetic, so a trace is only reused for identical inputs.
+      """
+      key = (tuple(audio_tensor.shape), audio_tensor.device)
+      if self._traced is None or self._traced[0] != key:
+         logging.info("Tracing HS-TasNet for input %s on %s", *key)
+         # Trace outside inference mode with a normal tensor so no inference tensors become constants
+         with torch.inference_mode(False), torch.no_grad():
+            example = audio_tensor.clone()
+            traced = torch.jit.trace(_SeparationOnly(self).eval(), example, check_trace=False)
+            self.__dict__['_traced'] = (key, torch.jit.optimize_for_inference(traced))
+      return self._traced[1](audio_tensor)
 
    def process_audio_tensor(
         self,
@@ -117,40 +195,25 @@ class BufferHSTasNet(HSTasNet):
         auto_convert_to_stereo = True,
         overwrite = False
     ):
-        logging.debug(f"Processing audio of shape {audio_tensor.shape}")
-
-        # curtail to divisible segment lens
-
-        audio_len = audio_tensor.shape[-1]
-        rounded_down_len = round_down_to_multiple(audio_len, self.segment_len)
+        logging.debug("Processing audio of shape %s", audio_tensor.shape)
 
-        audio_tensor = audio_tensor[..., :rounded_down_len]
-
-        # add batch
-        audio_tensor = rearrange(audio_tensor, '... -> 1 ...')
-
-        # maybe mono to stereo
-        mono_to_stereo = self.stereo and auto_convert_to_stereo and audio_tensor.shape[1] == 1
-        if mono_to_stereo:
-           logging.debug("Converting mono to stereo by duplicating channel")
-           audio_tensor = repeat(audio_tensor, '1 1 n -> 1 s n', s = 2)
+        audio_tensor, mono_to_stereo = prepare_input(
+            audio_tensor, self.segment_len, self.device, self.stereo, auto_convert_to_stereo)
 
         # inference
-        logging.debug(f"Running model inference on audio tensor {audio_tensor.shape}")
-        audio_tensor = audio_tensor.to(self.device)
+        logging.debug("Running model inference on audio tensor %s", audio_tensor.shape)
         with torch.no_grad():
             self.eval()
-            transformed, _ = self.forward(
-               audio_tensor,
-               return_reduced_sources=return_reduced_sources)
-
-        # remove batch
-
-        transformed = rearrange(transformed, '1 ... -> ...')
-
-        # maybe stereo to mono
-
-        if mono_to_stereo:
-            transformed = reduce(transformed, 's n -> 1 n', 'mean')
-
-        return transformed
+            transformed = None
+            if self.jit_trace and return_reduced_sources is None:
+               try:
+                  transformed = self._traced_forward(audio_tensor)
+               except Exception as e:
+                  logging.warning(f"Tracing failed ({e}); falling back to eager inference.")
+                  self.jit_trace = False
+            if transformed is None:
+               transformed, _ = self.forward(
+                  audio_tensor,
+                  return_reduced_sources=return_reduced_sources)
+
+        return finish_output(transformed, mono_to_stereo)
@@ -2,6 +2,7 @@ from typing import List
 import dataclasses
 import datetime
 import torch
+import numpy as np
 import logging
 
 from pal_stem_separator.buffer_hs_tasnet import SampleSpec
@@ -14,7 +15,13 @@ class Chunk:
     input_audio_tensor: torch.Tensor
     processed_audio_tensor: torch.Tensor | None = None
     truncated_audio_tensor: torch.Tensor | None = None
-    gains_applied: List[float] | None = None
+    gains_applied: np.ndarray | None = None
+    # Set when input_audio_tensor is being copied to the GPU asynchronously
+    input_ready_event: torch.cuda.Event | None = None
+    # RMS of input_audio_tensor, computed up front when normalizing
+    input_rms: torch.Tensor | None = None
+    # Interleaved PCM ready for stdout, split into views of a few PA buffers each
+    output_buffers: List[memoryview] | None = None
 
     received_at: datetime.datetime = dataclasses.field(default_factory=datetime.datetime.now, init=False)
     processing_started_at: datetime.datetime = None
@@ -37,9 +44,14 @@ class Chunk:
         return (self.output_completed_at - self.received_at).total_seconds()
 
     def log_timing(self):
-        logging.debug(f"Chunk timing: received at {self.received_at}, "
-                      f"processing started at {self.processing_started_at}, "
-                      f"processing completed at {self.processing_completed_at}, "
-                      f"output started at {self.output_started_at}, "
-                      f"output completed at {self.output_completed_at}")
+        logging.debug("Chunk timing: received at %s, "
+                      "processing started at %s, "
+                      "processing completed at %s, "
+                      "output started at %s, "
+                      "output completed at %s",
+                      self.received_at,
+                      self.processing_started_at,
+                      self.processing_completed_at,
+                      self.output_started_at,
+                      self.output_completed_at)
         logging.info(f"Chunk completed: gains {self.gains_applied}, processed {self.processed_duration_secs:.2f} s / truncated {self.truncated_duration_secs:.2f}, latency {self.latency_secs:.1f} s")
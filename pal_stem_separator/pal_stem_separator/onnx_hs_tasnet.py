@@ -0,0 +1,144 @@
+"""
+Run HS-TasNet through ONNX Runtime instead of eager PyTorch.
+
+The model is exported with torch.onnx.export and then served by an
+InferenceSession using the CUDA execution provider when the configured
+device is CUDA, falling back to the CPU provider otherwise.
+
+Requirements (installed in your Python env):
+  - onnxruntime (CPU) or onnxruntime-gpu (CUDA)
+
+Notes:
+  - Export traces the model, which bakes in shape arithmetic, so the graph is
+    exported once at load for a fixed length covering the longest chunk the
+    current chunk/overlap settings produce. Shorter chunks are zero-padded up
+    to it; a longer one (e.g. read just before the settings shrank) is run in
+    windows of that length.
+  - Exported files go in the user cache dir ($XDG_CACHE_HOME, or ~/.cache),
+    since the checkpoint may live somewhere read-only such as the Nix store,
+    and are re-exported whenever the checkpoint is newer.
+  - If onnxruntime is missing or the export or session setup fails,
+    inference falls back to the eager model.
+"""
+
+import hashlib
+import logging
+import os
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from pal_stem_separator.buffer_hs_tasnet import _SeparationOnly, finish_output, prepare_input
+from pal_stem_separator.stream_separator_utils import expand_path
+
+def onnx_cache_dir():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or expand_path("~/.cache")
+    return os.path.join(cache_home, "pulseaudio-lambda", "onnx")
+
+def export_onnx(model, shape, out_path: str) -> None:
+    logging.info("Exporting HS-TasNet for input %s to ONNX at %s", shape, out_path)
+    model.eval()
+    # Export outside inference mode (inference runs inside it) with a normal
+    # example tensor so no inference tensors become constants
+    with torch.inference_mode(False), torch.no_grad():
+        torch.onnx.export(
+            _SeparationOnly(model),
+            (torch.zeros(shape),),
+            out_path,
+            opset_version=17,
+            input_names=["audio"],
+            output_names=["stems"])
+    logging.info("ONNX export complete: %s", out_path)
+
+class OnnxHSTasNet:
+    """Drop-in replacement for BufferHSTasNet backed by an ONNX Runtime session."""
+
+    def __init__(self, model, checkpoint_path, max_len):
+        """Wrap a loaded model to serve chunks of up to max_len samples per channel."""
+        # The eager model stays on the CPU for exporting, and as the fallback
+        self.model = model.cpu()
+        self.checkpoint_path = checkpoint_path
+        self.sample_spec = model.sample_spec
+        self.segment_len = model.segment_len
+        self.stereo = model.stereo
+        # The exported length, rounded up to whole segments
+        self.max_len = -(-max_len // self.segment_len) * self.segment_len
+        self.device = torch.device("cpu")
+        self.session = None
+
+    def _onnx_path(self):
+        channels = 2 if self.stereo else 1
+        # Key on the checkpoint's path so different checkpoints don't share a file
+        key = hashlib.sha1(os.path.abspath(self.checkpoint_path).encode()).hexdigest()[:16]
+        return os.path.join(onnx_cache_dir(), f"{key}-{channels}x{self.max_len}.onnx")
+
+    def to(self, device):
+        """Export (if needed) and open the session on device, or return the eager model if that fails."""
+        device = torch.device(device)
+        try:
+            import onnxruntime as ort
+
+            if device.type == "cuda":
+                providers = [
+                    ("CUDAExecutionProvider", {
+                        "device_id": device.index or 0,
+                        "cudnn_conv_algo_search": "EXHAUSTIVE"}),
+                    "CPUExecutionProvider"]
+            else:
+                providers = ["CPUExecutionProvider"]
+            onnx_path = self._onnx_path()
+            if not os.path.exists(onnx_path) or os.path.getmtime(onnx_path) < os.path.getmtime(self.checkpoint_path):
+                os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+                channels = 2 if self.stereo else 1
+                # Export beside the target and rename so a failed export never looks fresh
+                tmp_path = f"{onnx_path}.{os.getpid()}.tmp"
+                export_onnx(self.model, (1, channels, self.max_len), tmp_path)
+                os.replace(tmp_path, onnx_path)
+            self.session = ort.InferenceSession(onnx_path, providers=providers)
+        except Exception as e:
+            logging.error(f"ONNX Runtime setup failed ({e}); falling back to eager inference.")
+            return self.model.to(device)
+        logging.info(f"ONNX Runtime session using providers: {self.session.get_providers()}")
+        self.device = device
+        return self
+
+    def _run(self, audio_tensor):
+        """Run the session on exactly max_len samples, returning the stems on the CPU."""
+        # Bind the input where it already lives so ORT reads it without a copy
+        # (ORT needs a dense buffer, so an expanded mono input is materialized here)
+        audio_tensor = audio_tensor.contiguous()
+        if self.device.type == "cuda":
+            # ORT runs on its own stream, so let torch's copies into the buffer finish first
+            torch.cuda.current_stream(self.device).synchronize()
+        binding = self.session.io_binding()
+        binding.bind_input(
+            name="audio",
+            device_type=self.device.type,
+            device_id=self.device.index or 0,
+            element_type=np.float32,
+            shape=tuple(audio_tensor.shape),
+            buffer_ptr=audio_tensor.data_ptr())
+        # Output is consumed on the CPU by the output thread anyway
+        binding.bind_output("stems", "cpu")
+        self.session.run_with_iobinding(binding)
+        return torch.from_numpy(binding.copy_outputs_to_cpu()[0])
+
+    def process_audio_tensor(self, audio_tensor: torch.Tensor, auto_convert_to_stereo = True):
+        logging.debug("Processing audio of shape %s with ONNX Runtime", audio_tensor.shape)
+
+        audio_tensor, mono_to_stereo = prepare_input(
+            audio_tensor, self.segment_len, self.device, self.stereo, auto_convert_to_stereo)
+
+        # The graph only takes max_len samples, so pad the input (or each window of
+        # an oversized one) up to it and crop the padding off the output
+        outputs = []
+        for start in range(0, max(audio_tensor.shape[-1], 1), self.max_len):
+            window = audio_tensor[..., start:start + self.max_len]
+            window_len = window.shape[-1]
+            if window_len < self.max_len:
+                window = F.pad(window, (0, self.max_len - window_len))
+            outputs.append(self._run(window)[..., :window_len])
+        transformed = outputs[0] if len(outputs) == 1 else torch.cat(outputs, dim=-1)
+
+        return finish_output(transformed, mono_to_stereo)
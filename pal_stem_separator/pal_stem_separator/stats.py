@@ -1,8 +1,8 @@
-import copy
 import logging
 from typing import Protocol, Self, Callable, Dict
 import dataclasses
-import json
+
+from pal_stem_separator.stream_separator_utils import json_dumps
 
 class Semigroup[T](Protocol[T]):
     def mappend(self, other: T) -> T: ...
@@ -21,9 +21,8 @@ class Value[T]:
         return self.value
 
     def set(self, value: T) -> Self:
-        x = copy.deepcopy(self)
-        x.value = value
-        return x
+        # Values are immutable wrappers, so a shallow rebuild is enough
+        return dataclasses.replace(self, value=value)
 
     def modify(self, f: Callable[[T], T]) -> Self:
         return self.set(f(self.value))
@@ -81,6 +80,29 @@ class StatsData:
 
     latency_secs: FloatLast = dataclasses.field(default_factory=lambda: FloatLast(None))
 
+_STATS_FIELDS = tuple(field.name for field in dataclasses.fields(StatsData))
+
+# Inline expression equivalent to each field monoid's mappend
+_INLINE_MAPPENDS = {
+    IntSum: "IntSum(a.{name}.value + b.{name}.value)",
+    FloatSum: "FloatSum(a.{name}.value + b.{name}.value)",
+    FloatLast: "a.{name} if b.{name}.value is None else b.{name}",
+}
+
+def _compile_stats_mappend():
+    """Generate Stats.mappend with each field's mappend inlined, so no reflection or dispatch per call."""
+    fields = ", ".join(
+        f"{field.name}=" + _INLINE_MAPPENDS[field.type].format(name=field.name)
+        for field in dataclasses.fields(StatsData))
+    source = (
+        "def mappend(self, other):\n"
+        "    a = self.value\n"
+        "    b = other.value\n"
+        f"    return type(self)(StatsData({fields}))\n")
+    namespace = {}
+    exec(source, {"StatsData": StatsData, **{cls.__name__: cls for cls in _INLINE_MAPPENDS}}, namespace)
+    return namespace["mappend"]
+
 class Stats(Value[StatsData], Monoid[StatsData]):
     @classmethod
     def create(cls, *args, **kwargs) -> Self:
@@ -90,15 +112,11 @@ class Stats(Value[StatsData], Monoid[StatsData]):
     def mempty(cls) -> Self:
         return cls(StatsData())
 
-    def mappend(self, other: Self) -> Self:
-        kwargs = {}
-        for field in dataclasses.fields(self.get()):
-            kwargs[field.name] = getattr(self.get(), field.name).mappend(getattr(other.get(), field.name))
-        return self.set(StatsData(**kwargs))
+    # Fieldwise mappend of each StatsData monoid
+    mappend = _compile_stats_mappend()
 
     def save(self, args):
-        with open(args.stats_path, 'w') as f:
-            data = {}
-            for field in dataclasses.fields(self.get()):
-                data[field.name] = getattr(self.get(), field.name).get()
-            json.dump(data, f)
\ No newline at end of file
+        stats_data = self.get()
+        data = {name: getattr(stats_data, name).value for name in _STATS_FIELDS}
+        with open(args.stats_path, 'wb') as f:
+            f.write(json_dumps(data))
\ No newline at end of file
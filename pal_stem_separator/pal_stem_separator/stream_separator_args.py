@@ -1,35 +1,171 @@
-from typing import List
+from typing import List, TYPE_CHECKING
 import dataclasses
 import pathlib
-import json
 import sys
 import os
 import argparse
+import contextlib
+import functools
 import logging
+import queue
+import tempfile
 import threading
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+import numpy as np
 
-from pal_stem_separator.stream_separator_utils import expand_path
+from pal_stem_separator.stream_separator_utils import expand_path, file_signature, json_dumps, json_loads
+
+if TYPE_CHECKING:
+    from watchdog.observers import Observer
 
 # Live global args singletons for auto-refresh
 _args = None  # Global to hold parsed args
 _args_lock = threading.Lock()
-
-class ArgsWatcher(FileSystemEventHandler):
-    def refresh(self, event):
-        if event.src_path == expand_path(Args.get_live().config_path):
-            logging.info("Reloaded config after change: %s", Args.refresh())
-
-    def on_modified(self, event):
-        super().on_modified(event)
-        self.refresh(event)
-
-    def on_moved(self, event):
-        super().on_moved(event)
-        self.refresh(event)
-
-@dataclasses.dataclass
+# Parsed config JSON keyed by path, with the file signature it was read at
+_config_json_cache = {}
+# Parsed command line, kept so config reloads don't re-run argparse
+_cli_namespace = None
+# File signature of the config as last saved from the live args, keyed by path,
+# so the watcher can ignore our own writes
+_self_written = {}
+# Fields written to the config file; the rest are CLI-only, inferred or runtime state
+_PERSISTED_FIELDS = (
+    'chunk_secs', 'overlap_secs', 'gains', 'muted', 'soloed', 'normalize', 'device', 'watch',
+    'checkpoint', 'onnx', 'torch_jit', 'quantize', 'debug',
+    'empty_queues_requested', 'queues_last_emptied_at', 'tui_tmux_session_name')
+# Quiet period after the last config file event before reloading
+CONFIG_RELOAD_DEBOUNCE_SECS = 0.3
+
+@functools.lru_cache(maxsize=None)
+def _ensure_config_dir(config_dir):
+    """Create the config dir the first time it's seen, rather than on every lookup."""
+    pathlib.Path(config_dir).mkdir(parents=True, exist_ok=True)
+    logging.info(f"Using config dir: {config_dir}")
+    return config_dir
+
+@functools.lru_cache(maxsize=None)
+def _build_parser():
+    """Build the CLI parser once; it only depends on the static option set."""
+    parser = argparse.ArgumentParser(description='Real-time audio stem separation')
+
+    parser.add_argument('--debug', action='store_true',
+                        help='Enable debug logging')
+
+    # Config JSON file
+    # Overridden temporarily by any provided command line args
+    # Defaults to the env variable $PA_LAMBDA_CONFIG_DIR or ~/.config/pulseaudio-lambda if not set
+    parser.add_argument('--config-dir', type=str, help='Path to config dir')
+
+    parser.add_argument('--save-config', action='store_true',
+                        help='If set, persist the current settings combination')
+
+    parser.add_argument('--watch', action='store_true',
+                        help='If set, watch the config file for changes and reload dynamically')
+
+    parser.add_argument('--gui', action='store_true',
+                        help='If set, also launch the gui')
+    parser.add_argument('--tui', action='store_true',
+                        help='If set, also launch the tui')
+    parser.add_argument('--tui-tmux-session-name', type=str,
+                        help='If set, also launch the tui in a tmux session with the given name')
+    parser.add_argument('--ui-only', action='store_true',
+                        help='If set, only launch the UI and exit')
+
+    # Checkpoint
+    parser.add_argument('--checkpoint', type=str,
+                        help='Path to model checkpoint. If unset, will use the environment variable $PA_LAMBDA_CHECKPOINT')
+
+    # Inference backend
+    parser.add_argument('--onnx', action='store_true',
+                        help='Run inference with ONNX Runtime (exported next to the checkpoint) instead of eager PyTorch')
+    parser.add_argument('--torch-jit', action='store_true',
+                        help='Run inference through a torch.jit traced and frozen module, re-traced when the chunk shape changes')
+    parser.add_argument('--quantize', action='store_true',
+                        help='Dynamically quantize Linear/LSTM weights to int8 when running on CPU')
+
+    # Chunk size in seconds
+    parser.add_argument('--chunk-secs', type=float,
+                        help='Chunk size in seconds')
+
+    # Overlap size in seconds
+    parser.add_argument('--overlap-secs', type=float,
+                        help='Overlap size in seconds')
+
+    # Volume controls for each stem or m to mute
+    parser.add_argument('--gains', type=str,
+                        help='Stem gain change for drums,bass,vocals,other (e.g. 50,m,100,m to mute bass and other, with half volume drums and full volume vocals)')
+
+    # Normalization
+    parser.add_argument('--normalize', action='store_true',
+                        help='Normalize output volume to match input intensity after applying gains')
+
+    # Device selection
+    parser.add_argument('--device', type=str,
+                        help='Device to use (cuda/cpu)')
+
+    parser.add_argument("--executorch-run-export", action='store_true', help="Output ExecuTorch package file (.pte)")
+    parser.add_argument("--executorch-output", default="exports/separation.pte", help="Output ExecuTorch package file (.pte)")
+    parser.add_argument("--executorch-example-len", type=int, default=8192, help="Example T dimension for export")
+
+    return parser
+
+def _make_args_watcher(config_path):
+    """Build the config file event handler, importing watchdog only when watching."""
+    from watchdog.events import PatternMatchingEventHandler
+
+    class ArgsWatcher(PatternMatchingEventHandler):
+        def __init__(self):
+            # Let watchdog drop events for the stats file, tempfiles and editor swap files
+            # Saves land via rename, and moves match on either the source or destination
+            super().__init__(
+                patterns=[os.path.basename(config_path)],
+                ignore_directories=True,
+                case_sensitive=True)
+            self.config_path = expand_path(config_path)
+            # At most one pending reload; further events while one is queued are redundant
+            self._pending = queue.Queue(maxsize=1)
+            threading.Thread(target=self._refresh_loop, name="config-reload", daemon=True).start()
+
+        def refresh(self, event):
+            # Runs on the observer thread, so just flag the change and return
+            try:
+                self._pending.put_nowait(None)
+            except queue.Full:
+                pass
+
+        def _refresh_loop(self):
+            while True:
+                self._pending.get()
+                # Editors write several times per save, so only reload once the events settle
+                while True:
+                    try:
+                        self._pending.get(timeout=CONFIG_RELOAD_DEBOUNCE_SECS)
+                    except queue.Empty:
+                        break
+                self._do_refresh(self.config_path)
+
+        def _do_refresh(self, config_path):
+            try:
+                stat = os.stat(config_path)
+            except OSError:
+                stat = None
+            if stat is not None and _self_written.get(config_path) == file_signature(stat):
+                logging.debug("Skipping reload of config written by this process: %s", config_path)
+                return
+            Args.refresh()
+            logging.info("Reloaded config after change: %s", config_path)
+
+        def on_modified(self, event):
+            super().on_modified(event)
+            self.refresh(event)
+
+        def on_moved(self, event):
+            super().on_moved(event)
+            self.refresh(event)
+
+    return ArgsWatcher()
+
+# Slots make the many per-chunk attribute reads on the live args plain slot loads
+@dataclasses.dataclass(slots=True)
 class Args:
     chunk_secs: float
     overlap_secs: float
@@ -40,6 +176,9 @@ class Args:
     device: str
     watch: bool
     checkpoint: str = "$PA_LAMBDA_CHECKPOINT"
+    onnx: bool = False
+    torch_jit: bool = False
+    quantize: bool = False
     debug: bool = False
     empty_queues_requested: str | None = None
     queues_last_emptied_at: str | None = None
@@ -52,22 +191,31 @@ class Args:
     config_dir: str | None = dataclasses.field(default=None, repr=False, compare=False)
     config_path: str | None = dataclasses.field(default=None, repr=False, compare=False)
     stats_path: str | None = dataclasses.field(default=None, repr=False, compare=False)
-    observer: Observer | None = dataclasses.field(default=None, repr=False, compare=False)
+    observer: "Observer | None" = dataclasses.field(default=None, repr=False, compare=False)
+    _effective_gains: np.ndarray | None = dataclasses.field(default=None, init=False, repr=False, compare=False)
+    # (persisted field snapshot, file signature) as last read or written
+    _last_saved: tuple | None = dataclasses.field(default=None, init=False, repr=False, compare=False)
 
     # Export args
     executorch_run_export: bool = False
     executorch_output: str = "export/separation.pte"
     executorch_example_len: int = 8192
 
+    @property
+    def expanded_checkpoint(self) -> str:
+        """The checkpoint path with ~ and environment variables expanded.
+
+        expand_path is cached, so this stays cheap and always follows edits to checkpoint.
+        """
+        return expand_path(self.checkpoint)
+
     @classmethod
     def get_config_dir(cls, args=None):
         config_dir = (
             args.config_dir if args is not None and args.config_dir is not None
             else os.environ.get('PA_LAMBDA_CONFIG_DIR',
                                 expand_path("~/.config/pulseaudio-lambda")))
-        pathlib.Path(config_dir).mkdir(parents=True, exist_ok=True)
-        logging.info(f"Using config dir: {config_dir}")
-        return config_dir
+        return _ensure_config_dir(config_dir)
 
     @classmethod
     def get_config_json_path(cls, config_dir=None, args=None):
@@ -84,17 +232,29 @@ class Args:
     @classmethod
     def refresh(cls):
         global _args
-        with _args_lock:
-            try:
-                _args = cls._load_live(first_load=False, prev_args=_args, silent=False)
-                logging.debug("Refreshed args")
-            except Exception as e:
-                logging.error(f"Error refreshing args: {e}")
+        # Build the new args outside the lock so readers never wait on the reload,
+        # then swap the reference in; the old instance is never mutated, so a thread
+        # holding it keeps a consistent snapshot for the rest of its iteration
+        try:
+            args = cls._load_live(first_load=False, prev_args=_args, silent=False)
+        except Exception as e:
+            logging.error(f"Error refreshing args: {e}")
             return _args
+        with _args_lock:
+            if _args is not None:
+                args._log_changes_from(_args)
+            _args = args
+        logging.debug("Refreshed args")
+        return _args
 
     @classmethod
     def get_live(cls):
         global _args
+        # refresh() swaps in a whole new Args, so reading the reference needs no lock;
+        # only the first load has to be serialized
+        args = _args
+        if args is not None:
+            return args
         with _args_lock:
             if _args is None:
                 _args = Args._load_live(first_load=True, prev_args=None, silent=False)
@@ -104,75 +264,29 @@ class Args:
     def _load_live(cls, first_load, prev_args, silent):
         """Get a live view of the args, merging CLI args and config file."""
 
-        parser = argparse.ArgumentParser(description='Real-time audio stem separation')
-
-        parser.add_argument('--debug', action='store_true',
-                            help='Enable debug logging')
-
-        # Config JSON file
-        # Overridden temporarily by any provided command line args
-        # Defaults to the env variable $PA_LAMBDA_CONFIG_DIR or ~/.config/pulseaudio-lambda if not set
-        parser.add_argument('--config-dir', type=str, help='Path to config dir')
-
-        parser.add_argument('--save-config', action='store_true',
-                            help='If set, persist the current settings combination')
-
-        parser.add_argument('--watch', action='store_true',
-                            help='If set, watch the config file for changes and reload dynamically')
+        global _cli_namespace
+        if first_load or _cli_namespace is None:
+            args = _build_parser().parse_args()
 
-        parser.add_argument('--gui', action='store_true',
-                            help='If set, also launch the gui')
-        parser.add_argument('--tui', action='store_true',
-                            help='If set, also launch the tui')
-        parser.add_argument('--tui-tmux-session-name', type=str,
-                            help='If set, also launch the tui in a tmux session with the given name')
-        parser.add_argument('--ui-only', action='store_true',
-                            help='If set, only launch the UI and exit')
+            # Set up logging to file + stderr (stdout is for audio)
+            log_format = '%(asctime)s - %(levelname)s - %(message)s'
+            log_level = logging.DEBUG if args.debug else logging.INFO
+            logging.basicConfig(
+                level=log_level,
+                format=log_format,
+                stream=sys.stderr)
 
-        # Checkpoint
-        parser.add_argument('--checkpoint', type=str,
-                            help='Path to model checkpoint. If unset, will use the environment variable $PA_LAMBDA_CHECKPOINT')
+            config_dir = Args.get_config_dir(args)
 
-        # Chunk size in seconds
-        parser.add_argument('--chunk-secs', type=float,
-                            help='Chunk size in seconds')
+            log_path = os.path.join(config_dir, "stream_separator.log")
+            logging.getLogger().addHandler(logging.FileHandler(log_path))
 
-        # Overlap size in seconds
-        parser.add_argument('--overlap-secs', type=float,
-                            help='Overlap size in seconds')
-
-        # Volume controls for each stem or m to mute
-        parser.add_argument('--gains', type=str,
-                            help='Stem gain change for drums,bass,vocals,other (e.g. 50,m,100,m to mute bass and other, with half volume drums and full volume vocals)')
-
-        # Normalization
-        parser.add_argument('--normalize', action='store_true',
-                            help='Normalize output volume to match input intensity after applying gains')
-
-        # Device selection
-        parser.add_argument('--device', type=str,
-                            help='Device to use (cuda/cpu)')
-
-        parser.add_argument("--executorch-run-export", action='store_true', help="Output ExecuTorch package file (.pte)")
-        parser.add_argument("--executorch-output", default="exports/separation.pte", help="Output ExecuTorch package file (.pte)")
-        parser.add_argument("--executorch-example-len", type=int, default=8192, help="Example T dimension for export")
-
-        args = parser.parse_args()
-
-        # Set up logging to file + stderr (stdout is for audio)
-        log_format = '%(asctime)s - %(levelname)s - %(message)s'
-        log_level = logging.DEBUG if args.debug else logging.INFO
-        logging.basicConfig(
-            level=log_level,
-            format=log_format,
-            stream=sys.stderr)
-
-        config_dir = Args.get_config_dir(args)
-
-        log_path = os.path.join(config_dir, "stream_separator.log")
-        logging.getLogger().addHandler(logging.FileHandler(log_path))
-
-        logging.debug(f"CLI args: {args}")
+            logging.debug("CLI args: %s", args)
+            _cli_namespace = args
+        else:
+            # The command line can't change after startup, so reloads only re-read the config
+            args = _cli_namespace
+            config_dir = Args.get_config_dir(args)
 
         config_json_path = Args.get_config_json_path(config_dir=config_dir, args=args)
         stats_json_path = Args.get_stats_json_path(config_dir=config_dir, args=args)
@@ -185,7 +299,8 @@ class Args:
         logging.info(f"Watch config for changes: {watch} (existing observer={observer})")
         if watch and (observer is None):
             logging.info(f"Setting up config file watcher for {config_dir}")
-            event_handler = ArgsWatcher()
+            from watchdog.observers import Observer
+            event_handler = _make_args_watcher(config_json_path)
             observer = Observer()
             observer.schedule(event_handler, expand_path(config_dir))
             observer.start()
@@ -196,25 +311,29 @@ class Args:
             observer = None
 
 
+        # Split --gains once and derive gains/mute/solo from the same tokens
+        gains_tokens = [x.strip() for x in args.gains.split(",")] if args.gains is not None else None
         combined = cls(
             gains=(
-                [ 0.0 if x.strip() == "m" else float(x.strip())
-                  for x in args.gains.split(",") ]
-                if args.gains is not None
+                [ 0.0 if t == "m" else float(t) for t in gains_tokens ]
+                if gains_tokens is not None
                 else config_args.gains),
             muted = (
-                [ x.strip() == "m" for x in args.gains.split(",") ]
-                if args.gains is not None
+                [ t == "m" for t in gains_tokens ]
+                if gains_tokens is not None
                 else config_args.muted),
             soloed = (
-                [ x.strip() == "s" for x in args.gains.split(",") ]
-                if args.gains is not None
+                [ t == "s" for t in gains_tokens ]
+                if gains_tokens is not None
                 else config_args.soloed),
             chunk_secs=args.chunk_secs if args.chunk_secs is not None else config_args.chunk_secs,
             overlap_secs=args.overlap_secs if args.overlap_secs is not None else config_args.overlap_secs,
             device=args.device if args.device is not None else config_args.device,
             normalize=args.normalize or config_args.normalize,
             checkpoint=checkpoint,
+            onnx=args.onnx or config_args.onnx,
+            torch_jit=args.torch_jit or config_args.torch_jit,
+            quantize=args.quantize or config_args.quantize,
             debug=debug,
             config_dir=config_dir,
             config_path=config_json_path,
@@ -232,7 +351,8 @@ class Args:
             executorch_output=args.executorch_output or config_args.executorch_output,
             executorch_example_len=args.executorch_example_len or config_args.executorch_example_len
         )
-        logging.info(f"Configuration: {combined}")
+        if first_load:
+            logging.info("Configuration: %s", combined)
 
         if args.save_config and first_load:
             combined.save()
@@ -243,38 +363,87 @@ class Args:
     def read(cls, config_dir=None):
         """Read the config only, don't set up watching or merge with CLI args."""
         config_json_path = cls.get_config_json_path(config_dir=config_dir)
-        if not os.path.exists(config_json_path):
-            raise FileNotFoundError(f"Config file not found: {config_json_path}")
         stats_json_path = cls.get_stats_json_path(config_dir=config_dir)
-        with open(config_json_path, 'r') as f:
-            args = cls(
-                config_dir=config_dir,
-                config_path=config_json_path,
-                stats_path=stats_json_path,
-                **(json.load(f)))
-            logging.info(f"Loaded config args: {args}")
-            return args
+        try:
+            f = open(config_json_path, 'rb')
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Config file not found: {config_json_path}") from None
+        with f:
+            # Only re-parse if the file changed since it was last read
+            stat = os.fstat(f.fileno())
+            signature = file_signature(stat)
+            cached = _config_json_cache.get(config_json_path)
+            if cached is not None and cached[0] == signature:
+                data = cached[1]
+            else:
+                data = json_loads(f.read())
+                _config_json_cache[config_json_path] = (signature, data)
+        # Copy the lists since callers mutate the returned config in place
+        args = cls(
+            config_dir=config_dir,
+            config_path=config_json_path,
+            stats_path=stats_json_path,
+            **{k: list(v) if isinstance(v, list) else v for k, v in data.items()})
+        args._last_saved = (args._snapshot(), signature)
+        # Every reload and UI poll reads the config, so only show it when debugging
+        logging.debug("Loaded config args: %s", args)
+        return args
+
+    def _log_changes_from(self, old):
+        """Log only the fields that differ from the args being replaced."""
+        diff = {
+            f.name: (getattr(old, f.name), getattr(self, f.name))
+            for f in dataclasses.fields(self)
+            if f.init and getattr(old, f.name) != getattr(self, f.name)}
+        if diff:
+            logging.info("Config changed: %s", diff)
+
+    def _snapshot(self):
+        """Hashable copy of the persisted fields, to tell whether a save would change anything."""
+        return tuple(
+            tuple(value) if isinstance(value, list) else value
+            for value in (getattr(self, name) for name in _PERSISTED_FIELDS))
 
     def save(self):
         try:
-            observer = self.observer
-            self.observer = None  # Temporarily remove observer for serialization
-            data = dataclasses.asdict(self)
-            self.observer = observer
-
-            del data['config_dir']
-            del data['config_path']
-            del data['stats_path']
-            del data['gui']
-            del data['tui']
-            del data['ui_only']
-            del data['observer']
-            del data['executorch_run_export']
-            del data['executorch_output']
-            del data['executorch_example_len']
-            with open(self.config_path, 'w') as f:
-                json.dump(data, f, indent=4)
-            logging.info(f"Saved config {data} to {self.config_path}")
+            # Skip the write if nothing persisted changed and the file is still what we last saw
+            snapshot = self._snapshot()
+            if self._last_saved is not None and self._last_saved[0] == snapshot:
+                try:
+                    stat = os.stat(self.config_path)
+                    if self._last_saved[1] == file_signature(stat):
+                        logging.debug("Config unchanged, skipping save to %s", self.config_path)
+                        return
+                except OSError:
+                    pass
+            # Pick the persisted fields directly rather than deep-copying everything via asdict;
+            # the dict is serialized straight away so no copies are needed
+            data = {name: getattr(self, name) for name in _PERSISTED_FIELDS}
+            # Write to a sibling file and rename over the config so that a
+            # watcher reading concurrently never sees a partially written file;
+            # the name is unique so concurrent saves can't replace each other's file
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(self.config_path),
+                prefix=f".{os.path.basename(self.config_path)}.", suffix=".tmp")
+            try:
+                # mkstemp creates the file owner-only; keep the config's usual mode
+                os.fchmod(fd, 0o644)
+                with open(fd, 'wb') as f:
+                    f.write(json_dumps(data, indent=True))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.config_path)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.unlink(tmp_path)
+                raise
+            stat = os.stat(self.config_path)
+            signature = file_signature(stat)
+            self._last_saved = (snapshot, signature)
+            if self is _args:
+                # The live args already hold what was written, so there's nothing to reload
+                _self_written[expand_path(self.config_path)] = signature
+            logging.info("Saved config %s to %s", data, self.config_path)
         except Exception as e:
             logging.error(f"Failed to save config to {self.config_path}: {e}")
     
@@ -294,32 +463,34 @@ class Args:
             self.observer.join()
             self.observer = None
 
-    def get_effective_gains(self) -> List[float]:
-        """Get the actual gains to apply, considering mute/solo state."""
-        effective_gains = []
-        any_soloed = any(self.soloed)
-
-        for i in range(len(self.gains)):
-            if self.muted[i]:
-                # Muted stems get 0 gain
-                effective_gains.append(0.0)
-            elif any_soloed and not self.soloed[i]:
-                # If any stems are soloed and this one isn't, mute it
-                effective_gains.append(0.0)
-            else:
-                # Use the configured gain
-                effective_gains.append(self.gains[i])
+    def get_effective_gains(self) -> np.ndarray:
+        """Get the actual gains to apply, considering mute/solo state.
+
+        Cached until gains or mute/solo state change through the methods below.
+        """
+        if self._effective_gains is None:
+            soloed = np.asarray(self.soloed, dtype=bool)
+            # Muted stems get 0 gain, and if any stems are soloed the rest are muted
+            silenced = np.asarray(self.muted, dtype=bool) | (soloed.any() & ~soloed)
+            # float32 matches the stems, so the per-chunk tensor conversion needs no cast
+            self._effective_gains = np.where(silenced, np.float32(0.0), np.asarray(self.gains, dtype=np.float32))
+        return self._effective_gains
 
-        return effective_gains
+    def set_gain(self, index: int, value: float):
+        """Set the gain for a stem."""
+        self.gains[index] = value
+        self._effective_gains = None
 
     def reset_volumes(self):
         """Reset all volumes to 100% and clear mute/solo state."""
         self.gains = [100.0, 100.0, 100.0, 100.0]
         self.muted = [False, False, False, False]
         self.soloed = [False, False, False, False]
+        self._effective_gains = None
 
     def toggle_mute(self, index: int):
         """Toggle mute state for a stem."""
+        self._effective_gains = None
         if 0 <= index < len(self.muted):
             self.muted[index] = not self.muted[index]
             # Clear solo when muting
@@ -328,6 +499,7 @@ class Args:
 
     def toggle_solo(self, index: int):
         """Toggle solo state for a stem."""
+        self._effective_gains = None
         if 0 <= index < len(self.soloed):
             self.soloed[index] = not self.soloed[index]
             # Clear mute when soloing
@@ -1,8 +1,39 @@
 import os
+import json
+import functools
 
+# orjson is a dependency since it's much faster than the stdlib encoder, especially with
+# indentation; the stdlib is still used if it's missing, e.g. outside the project environment
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Paths and the environment don't change at runtime, so each expansion is computed once
+@functools.lru_cache(maxsize=256)
 def expand_path(path):
     return os.path.expandvars(os.path.expanduser(path))
 
+def file_signature(stat):
+    """Identify a file's contents by its stat, to tell whether it changed since last seen.
+
+    The inode changes on every atomic replace and ctime on every write, which catches
+    same-size rewrites that land within one mtime tick.
+    """
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_ctime_ns, stat.st_size)
+
+def json_dumps(data, indent=False) -> bytes:
+    """Serialize to JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(data, indent=2 if indent else None).encode()
+
+def json_loads(data):
+    """Parse JSON from bytes or str, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 def get_stem_name(self, index: int) -> str:
     """Get the name of a stem by index."""
     names = ["Drums", "Bass", "Vocals", "Other"]
@@ -1,14 +1,54 @@
 from hs_tasnet import HSTasNet, Trainer, MusDB18HQ
-import torchaudio
-import fire
+import soundfile as sf
+import os
 import sys
+import json
+import random
+import hashlib
+import inspect
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import numpy as np
-import termplotlib as tpl
+import torch
 
 def mixture_length_secs(path):
-    audio, sample_rate = torchaudio.load(f"{path}/mixture.wav")
-    return audio.shape[-1] / sample_rate
+    info = sf.info(f"{path}/mixture.wav")
+    return info.frames / info.samplerate
+
+def cached_mixture_lengths_secs(dataset_path, paths):
+    """Mixture lengths, reusing a JSON sidecar keyed on each file's mtime and size."""
+    cache_path = os.path.join(dataset_path, "mixture_lengths.json")
+    try:
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        cache = {}
+
+    signatures = {}
+    for path in paths:
+        stat = os.stat(f"{path}/mixture.wav")
+        signatures[str(path)] = [stat.st_mtime_ns, stat.st_size]
+    stale = [
+        path for path in paths
+        if cache.get(str(path), {}).get("signature") != signatures[str(path)]]
+
+    # Probing is I/O bound, so threads overlap the header reads
+    if stale:
+        with ThreadPoolExecutor(max_workers=min(32, len(stale))) as executor:
+            for path, secs in zip(stale, executor.map(mixture_length_secs, stale)):
+                cache[str(path)] = {"signature": signatures[str(path)], "secs": secs}
+
+    lengths_secs = [cache[str(path)]["secs"] for path in paths]
+
+    if stale:
+        try:
+            with open(cache_path, 'w') as f:
+                json.dump(cache, f)
+            logging.info(f"Updated mixture length cache at {cache_path}")
+        except OSError as e:
+            # e.g. a read-only dataset; the lengths just get probed again next time
+            logging.warning(f"Could not write mixture length cache at {cache_path}: {e}")
+    return lengths_secs
 
 class MaxMusDB18HQ(MusDB18HQ):
     """Set the max length to the shortest audio."""
@@ -18,6 +58,8 @@ class MaxMusDB18HQ(MusDB18HQ):
         sep_filenames = ('drums', 'bass', 'vocals', 'other'),
         max_audio_length_seconds = None,
         paths = None,
+        cache_dir = None,
+        mixture_lengths_secs = None,
     ):
         # Override init if paths explicitly given
         if paths is not None:
@@ -30,44 +72,149 @@ class MaxMusDB18HQ(MusDB18HQ):
         self.dataset_path = dataset_path
         self.sep_filenames = sep_filenames
         self.orignal_max_audio_length_seconds = max_audio_length_seconds
-        self.mixture_lengths_secs = [
-            mixture_length_secs(path) for path in self.paths]
+        self.mixture_lengths_secs = (
+            cached_mixture_lengths_secs(dataset_path, self.paths)
+            if mixture_lengths_secs is None
+            else mixture_lengths_secs)
 
         # If unset, set to shortest audio in dataset
-        if max_audio_length_seconds is None:
-            self.max_audio_length_seconds = (
-                int(min(self.mixture_lengths_secs))
-                if max_audio_length_seconds is None
-                else max_audio_length_seconds)
+        self.max_audio_length_seconds = (
+            int(min(self.mixture_lengths_secs))
+            if max_audio_length_seconds is None
+            else max_audio_length_seconds)
 
         logging.info(f"Max audio length set to shortest audio: {self.max_audio_length_seconds} seconds.")
 
-    def length_hist(self):
-        ls = np.array(self.mixture_lengths_secs)
-        counts, bin_edges = np.histogram(ls.astype('int'), bins=40)
-        fig = tpl.figure()
-        fig.hist(
-            counts,
-            bin_edges,
-            orientation='horizontal',
-            force_ascii=True)
-        return fig
+        self._length_hist = None
+
+        self.cache_dir = cache_dir
+        self.cache_manifest = None
+        self._cached_sources = {}
+        if cache_dir is not None:
+            self.prepare_cache(cache_dir)
+
+    @property
+    def source_names(self):
+        return ("mixture", *self.sep_filenames)
+
+    def prepare_cache(self, cache_dir):
+        """Decode each track once into int16 .npy files that are memory-mapped when cropping."""
+        os.makedirs(cache_dir, exist_ok=True)
+        manifest_path = os.path.join(cache_dir, "manifest.json")
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            manifest = {}
+
+        updated = False
+        for path in self.paths:
+            # Sign every source so an edited stem also invalidates the cached copy
+            signature = [
+                [stat.st_mtime_ns, stat.st_size]
+                for stat in (os.stat(f"{path}/{name}.wav") for name in self.source_names)]
+            entry = manifest.get(str(path))
+            if entry is not None and entry["signature"] == signature:
+                continue
+
+            track_dir = os.path.join(cache_dir, hashlib.sha1(str(path).encode()).hexdigest()[:16])
+            os.makedirs(track_dir, exist_ok=True)
+            entry = {"signature": signature, "files": {}}
+            for name in self.source_names:
+                # (frames, channels) int16, i.e. the WAV PCM layout
+                data, sample_rate = sf.read(f"{path}/{name}.wav", dtype='int16', always_2d=True)
+                file_path = os.path.join(track_dir, f"{name}.npy")
+                np.save(file_path, data)
+                entry["files"][name] = file_path
+                entry["frames"] = data.shape[0]
+                entry["sample_rate"] = sample_rate
+            manifest[str(path)] = entry
+            updated = True
+            logging.info(f"Cached {path} in {track_dir}")
+
+        if updated:
+            with open(manifest_path, 'w') as f:
+                json.dump(manifest, f)
+        self.cache_manifest = manifest
+        return self
+
+    def _cached_source(self, entry, name):
+        # Opened lazily so each DataLoader worker maps its own view of the file
+        file_path = entry["files"][name]
+        if file_path not in self._cached_sources:
+            self._cached_sources[file_path] = np.load(file_path, mmap_mode='r')
+        return self._cached_sources[file_path]
+
+    def _random_crop(self, frames, sample_rate):
+        num_frames = min(frames, int(self.max_audio_length_seconds * sample_rate))
+        start = random.randint(0, frames - num_frames)
+        return start, start + num_frames
+
+    def __getitem__(self, idx):
+        path = self.paths[idx]
+
+        if self.cache_manifest is not None:
+            entry = self.cache_manifest[str(path)]
+            start, stop = self._random_crop(entry["frames"], entry["sample_rate"])
+            # Only the cropped range is paged in from the memmaps
+            sources = [
+                torch.from_numpy(self._cached_source(entry, name)[start:stop].T.astype(np.float32)).mul_(1.0 / 32768.0)
+                for name in self.source_names]
+        else:
+            info = sf.info(f"{path}/mixture.wav")
+            start, stop = self._random_crop(info.frames, info.samplerate)
+            # Seek and decode only the cropped range rather than the whole track
+            sources = [
+                torch.from_numpy(sf.read(f"{path}/{name}.wav", start=start, stop=stop, dtype='float32', always_2d=True)[0].T)
+                for name in self.source_names]
+
+        audio, targets = sources[0], torch.stack(sources[1:])
+        return audio, targets
+
+    def length_hist(self, width=60):
+        """Horizontal ASCII histogram of mixture lengths, built once and cached."""
+        if self._length_hist is None:
+            ls = np.array(self.mixture_lengths_secs)
+            counts, bin_edges = np.histogram(ls.astype(np.int32), bins=40)
+            bar_lengths = np.ceil(counts * (width / max(1, counts.max()))).astype(np.int64)
+            rows = np.char.add(
+                np.char.add(np.char.mod("[%7.1f - ", bin_edges[:-1]), np.char.mod("%7.1f)  ", bin_edges[1:])),
+                np.char.add(np.char.mod("%4d  ", counts), np.char.multiply("*", bar_lengths)))
+            self._length_hist = "\n".join(rows)
+        return self._length_hist
 
     def split(self, length_boundary_secs):
         """Return two new datasets split by whether the audio is longer/shorter."""
-        def split_by(p):
+        lengths_secs = np.asarray(self.mixture_lengths_secs)
+        paths = np.asarray(self.paths, dtype=object)
+        shorter = lengths_secs <= length_boundary_secs
+
+        def split_by(mask):
+            # Lengths are passed through so the new datasets don't re-probe
             return MaxMusDB18HQ(
                 self.dataset_path,
                 sep_filenames = self.sep_filenames,
-                paths = [
-                    path
-                    for path, length_secs
-                    in zip(self.paths, self.mixture_lengths_secs)
-                    if p(length_secs)],
-                max_audio_length_seconds = self.orignal_max_audio_length_seconds)
-        return (
-            split_by(lambda secs: secs <= length_boundary_secs),
-            split_by(lambda secs: secs > length_boundary_secs))
+                paths = paths[mask].tolist(),
+                max_audio_length_seconds = self.orignal_max_audio_length_seconds,
+                cache_dir = self.cache_dir,
+                mixture_lengths_secs = lengths_secs[mask].tolist())
+        return split_by(shorter), split_by(~shorter)
+
+def dataloader_kwargs(num_workers, pin_memory, persistent_workers, prefetch_factor):
+    """DataLoader tuning knobs, dropping those only valid with worker processes."""
+    kwargs = dict(num_workers=num_workers, pin_memory=pin_memory)
+    if num_workers > 0:
+        kwargs.update(persistent_workers=persistent_workers, prefetch_factor=prefetch_factor)
+    return kwargs
+
+def trainer_supported_kwargs(kwargs):
+    """Keep only the kwargs the installed Trainer accepts, warning about the rest."""
+    params = inspect.signature(Trainer.__init__).parameters
+    supported = {k: v for k, v in kwargs.items() if k in params}
+    unsupported = sorted(set(kwargs) - set(supported))
+    if unsupported:
+        logging.warning(f"Installed Trainer does not accept {unsupported}; ignoring.")
+    return supported
 
 def train(
     experiment_name=None,
@@ -83,16 +230,24 @@ def train(
     use_wandb = True,
     wandb_project = 'HS-TasNet',
     musdb18hq_root = "./data/musdb18hq",
+    cache_dir = None,
     split_dataset_eval_secs = 30,
     split_dataset_eval_frac = None,
     checkpoint_every = 10,
     eval_sdr = False,
     decay_lr_if_not_improved_steps = 10,
     early_stop_if_not_improved_steps = 20,
+    num_workers = 8,
+    pin_memory = True,
+    persistent_workers = True,
+    prefetch_factor = 4,
+    compile = False,
+    cuda_graph = False,
 ):
     dataset = MaxMusDB18HQ(
         musdb18hq_root,
-        max_audio_length_seconds=max_audio_length_seconds)
+        max_audio_length_seconds=max_audio_length_seconds,
+        cache_dir=cache_dir)
 
     if split_dataset_eval_secs is not None:
         assert split_dataset_eval_frac is None, "Can only split by seconds or fraction, not both."
@@ -109,15 +264,15 @@ def train(
         for k, dataset in {"train": train_dataset, "eval": eval_dataset}.items():
             if dataset is None:
                 continue
-            logging.info(f"Dataset {k} mixture lengths:")
-            for i, (item, mixture_length_secs) in enumerate(zip(dataset, dataset.mixture_lengths_secs)):
-                audio, targets = item
-                logging.info(f"{k}: Audio {i}: {mixture_length_secs:.2f} seconds")
-                logging.info(f"{k}: Audio {i}: {audio.shape[-1]} samples")
-                for j, target in enumerate(targets):
-                    logging.info(f"{k}: Audio {i} - Target {j}: {target.shape[-1]} samples")
-            logging.info("{k}: Histogram")
-            dataset.length_hist().show()
+            # Lengths are already known, so report them without decoding any audio
+            lines = [f"Dataset {k} mixture lengths (cropped to {dataset.max_audio_length_seconds} seconds):"]
+            lines.extend(
+                f"{k}: Audio {i}: {mixture_length_secs:.2f} seconds ({path})"
+                for i, (path, mixture_length_secs)
+                in enumerate(zip(dataset.paths, dataset.mixture_lengths_secs)))
+            logging.info("\n".join(lines))
+            logging.info(f"{k}: Histogram")
+            print(dataset.length_hist())
         return
 
     if experiment_name is None:
@@ -133,6 +288,14 @@ def train(
         stereo = stereo
     )
 
+    if compile or cuda_graph:
+        # Compile in place so checkpoints keep the eager module's state_dict keys
+        # reduce-overhead captures the fixed-shape steps into CUDA graphs
+        mode = "reduce-overhead" if cuda_graph else "max-autotune"
+        # Compilation is lazy, so any compile error surfaces on the first training step
+        logging.info(f"Compiling model with torch.compile (mode={mode})")
+        model.compile(mode = mode)
+
     trainer = Trainer(
         model,
         dataset = train_dataset,
@@ -150,7 +313,12 @@ def train(
         eval_results_folder = eval_results_folder,
         cpu = cpu,
         use_ema = use_ema,
-        eval_sdr = eval_sdr
+        eval_sdr = eval_sdr,
+        **trainer_supported_kwargs(dataloader_kwargs(
+            num_workers = num_workers,
+            pin_memory = pin_memory,
+            persistent_workers = persistent_workers,
+            prefetch_factor = prefetch_factor))
     )
 
     trainer()
@@ -159,6 +327,8 @@ def train(
 # --small for small model
 
 if __name__ == '__main__':
+    import fire
+
     # Set up logging to stderr (stdout is for audio)
     logging.basicConfig(
         level=logging.DEBUG,
@@ -1,11 +1,13 @@
 import logging
-from pal_stem_separator.ui.web import StreamSeparatorWebGUI
-from pal_stem_separator.ui.tui import StreamSeparatorTUI
+
+# The UI modules are imported on demand so each mode only pays for its own framework
 
 def run_gui():
+    from pal_stem_separator.ui.web import StreamSeparatorWebGUI
     logging.info("Starting GUI mode...")
     StreamSeparatorWebGUI().run()
 
 def run_tui():
+    from pal_stem_separator.ui.tui import StreamSeparatorTUI
     logging.info("Starting TUI mode...")
     StreamSeparatorTUI().run()
@@ -6,17 +6,33 @@ from textual.reactive import reactive
 from textual import events
 from textual.message import Message
 import asyncio
+import copy
+import functools
+import re
+import threading
 import time
+from typing import Callable
 
 from pal_stem_separator.stream_separator_args import Args
+from pal_stem_separator.stream_separator_utils import json_loads
+
+_SIMPLE_FIELD = re.compile(r"\{:([-+ 0#]*\d*(?:\.\d+)?[dfeEgG])\}")
+
+def compile_formatter(template: str) -> Callable[[float], str]:
+    """Turn a single-field "{:spec}" template into a %-format callable where possible."""
+    rest = _SIMPLE_FIELD.sub("", template)
+    if len(_SIMPLE_FIELD.findall(template)) == 1 and "{" not in rest and "}" not in rest:
+        return _SIMPLE_FIELD.sub(lambda m: "%" + m.group(1), template.replace("%", "%%")).__mod__
+    return template.format
+
 
 class Slider(Widget):
     """A custom slider widget with mouse support."""
     
+    # Only value changes at runtime; the range and step are plain attributes
     value = reactive(50.0)
-    min_value = reactive(0.0)
-    max_value = reactive(100.0)
-    step = reactive(1.0)
+    # Mouse drags apply at most one value per frame
+    FRAME_SECS = 1 / 60
     
     class Changed(Message):
         """Message sent when slider value changes."""
@@ -27,10 +43,19 @@ class Slider(Widget):
     def __init__(self, value: float = 50.0, min_value: float = 0.0, 
                  max_value: float = 100.0, step: float = 1.0, **kwargs):
         super().__init__(**kwargs)
+        # (width, pos, rendered) from the last render; most repaints land on the same cell
+        self._render_cache: tuple[int, int, str] | None = None
+        self._last_mouse_x = -1
+        self._pending_value: float | None = None
+        self._flush_timer = None
         self.value = value
         self.min_value = min_value
         self.max_value = max_value
         self.step = step
+        # The range and step are fixed, so keep their derived factors around
+        self._range = max_value - min_value
+        self._inv_range = 1.0 / self._range if self._range != 0 else 0.0
+        self._inv_step = 1.0 / step if step > 0 else 0.0
     
     def render(self) -> str:
         """Render the slider."""
@@ -39,21 +64,21 @@ class Slider(Widget):
             return ""
         
         # Calculate position
-        range_val = self.max_value - self.min_value
-        if range_val == 0:
-            pos = 0
-        else:
-            pos = int((self.value - self.min_value) / range_val * width)
+        pos = int((self.value - self.min_value) * self._inv_range * width)
         pos = max(0, min(width - 1, pos))
         
+        if self._render_cache is not None and self._render_cache[:2] == (width, pos):
+            return self._render_cache[2]
+
         # Build slider string
-        bar = "─" * width
-        bar = bar[:pos] + "●" + bar[pos+1:]
-        return f"[{bar}]"
+        rendered = f"[{'─' * pos}●{'─' * (width - pos - 1)}]"
+        self._render_cache = (width, pos, rendered)
+        return rendered
     
     def on_mouse_down(self, event: events.MouseDown) -> None:
         """Handle mouse click on slider."""
         if event.button == 1:  # Left button
+            self._last_mouse_x = -1
             self._update_from_mouse(event.x)
     
     def on_mouse_move(self, event: events.MouseMove) -> None:
@@ -67,18 +92,34 @@ class Slider(Widget):
         if width <= 0:
             return
         
-        # Calculate value from position
+        # Calculate value from position, dropping moves within the same cell
         x = max(1, min(width, x - 1))
-        range_val = self.max_value - self.min_value
-        new_value = self.min_value + (x / width) * range_val
+        if x == self._last_mouse_x:
+            return
+        self._last_mouse_x = x
+        new_value = self.min_value + (x / width) * self._range
         
         # Round to step
         if self.step > 0:
-            new_value = round(new_value / self.step) * self.step
+            new_value = round(new_value * self._inv_step) * self.step
         
-        # Clamp and set
-        self.value = max(self.min_value, min(self.max_value, new_value))
-        self.post_message(self.Changed(self.value))
+        # Clamp, and skip if the stepped value didn't actually move
+        new_value = max(self.min_value, min(self.max_value, new_value))
+        if new_value == (self.value if self._pending_value is None else self._pending_value):
+            return
+
+        # Defer to the next frame so a burst of mouse reports becomes one update
+        self._pending_value = new_value
+        if self._flush_timer is None:
+            self._flush_timer = self.set_timer(self.FRAME_SECS, self._flush_pending_value)
+
+    def _flush_pending_value(self) -> None:
+        """Apply the latest dragged value and notify once."""
+        self._flush_timer = None
+        value, self._pending_value = self._pending_value, None
+        if value is not None and value != self.value:
+            self.value = value
+            self.post_message(self.Changed(value))
     
     def on_key(self, event: events.Key) -> None:
         """Handle keyboard input."""
@@ -99,18 +140,28 @@ class SliderWithLabel(Container):
         super().__init__(**kwargs)
         self.label_text = label
         self.format_str = format_str
+        self._format_label = compile_formatter(
+            label.replace("{", "{{").replace("}", "}}") + ": " + format_str)
         self.slider = Slider(value=value, min_value=min_value, 
                             max_value=max_value, step=step)
-        self.label = Label(f"{label}: {format_str.format(value)}")
+        self._label_text = self._format_label(value)
+        self.label = Label(self._label_text)
     
     def compose(self) -> ComposeResult:
         with Horizontal():
             yield self.label
             yield self.slider
     
+    def _update_label(self, value: float) -> None:
+        """Update the label, skipping the re-render if the text is unchanged."""
+        text = self._format_label(value)
+        if text != self._label_text:
+            self._label_text = text
+            self.label.update(text)
+
     def on_slider_changed(self, message: Slider.Changed) -> None:
         """Update label when slider changes."""
-        self.label.update(f"{self.label_text}: {self.format_str.format(message.value)}")
+        self._update_label(message.value)
     
     @property
     def value(self) -> float:
@@ -119,7 +170,7 @@ class SliderWithLabel(Container):
     @value.setter
     def value(self, val: float) -> None:
         self.slider.value = val
-        self.label.update(f"{self.label_text}: {self.format_str.format(val)}")
+        self._update_label(val)
 
 
 class StemControl(Container):
@@ -138,15 +189,20 @@ class StemControl(Container):
             step=1.0,
             format_str="{:.0f}%"
         )
+        self._muted = muted
+        self._soloed = soloed
+        # Kept so the mute/solo setters don't need a query_one per toggle
+        self._mute_btn = Button("M", variant="error" if muted else "default",
+                                id=f"mute_{self.stem_index}")
+        self._solo_btn = Button("S", variant="warning" if soloed else "default",
+                                id=f"solo_{self.stem_index}")
         
     def compose(self) -> ComposeResult:
         with Vertical():
             yield self.slider
             with Horizontal():
-                yield Button("M", variant="error" if self.muted else "default", 
-                           id=f"mute_{self.stem_index}")
-                yield Button("S", variant="warning" if self.soloed else "default", 
-                           id=f"solo_{self.stem_index}")
+                yield self._mute_btn
+                yield self._solo_btn
     
     @property
     def value(self) -> float:
@@ -158,23 +214,21 @@ class StemControl(Container):
     
     @property
     def muted(self) -> bool:
-        return getattr(self, '_muted', False)
+        return self._muted
     
     @muted.setter
     def muted(self, val: bool) -> None:
         self._muted = val
-        mute_btn = self.query_one(f"#mute_{self.stem_index}")
-        mute_btn.variant = "error" if val else "default"
+        self._mute_btn.variant = "error" if val else "default"
     
     @property
     def soloed(self) -> bool:
-        return getattr(self, '_soloed', False)
+        return self._soloed
     
     @soloed.setter
     def soloed(self, val: bool) -> None:
         self._soloed = val
-        solo_btn = self.query_one(f"#solo_{self.stem_index}")
-        solo_btn.variant = "warning" if val else "default"
+        self._solo_btn.variant = "warning" if val else "default"
 
 
 class StreamSeparatorTUI(App):
@@ -261,11 +315,30 @@ class StreamSeparatorTUI(App):
         super().__init__()
         self.config = Args.read()
         self.stem_controls = {}
+        self._ordered_stem_controls: list[StemControl] = []  # Indexed by stem
         self.sliders = {}
+        # (config attribute, inner Slider) pairs read directly on save
+        self._setting_sliders: list[tuple[str, Slider]] = []
         self.device_radio = None
         self.checkpoint_input = None
+        # Button id -> handler, so presses are a single lookup
+        self._button_dispatch: dict[str, Callable[[], None]] = {
+            "save-button": self.save_config_now,
+            "reset-volumes": self.reset_all_volumes,
+            "empty-queues": self.empty_queues,
+        }
+        for i in range(4):
+            self._button_dispatch[f"mute_{i}"] = functools.partial(self.toggle_mute, i)
+            self._button_dispatch[f"solo_{i}"] = functools.partial(self.toggle_solo, i)
         self.last_save_time = 0
         self.save_delay = 0.2  # Throttle saves to max once per 200ms
+        self._pending_timer = None
+        self._dirty = False  # Set when self.config differs from what was last saved
+        # Newest config snapshot waiting for the save worker, and whether one is running
+        self._queued_save = None
+        self._save_worker_running = False
+        self._save_lock = threading.Lock()  # Guards the two above
+        self._write_lock = threading.Lock()  # Held while a save writes the file
         # Stats state
         self.prev_stats = None
         self.prev_stats_at = 0.0
@@ -310,6 +383,7 @@ class StreamSeparatorTUI(App):
                         id=f"stem_{i}"
                     )
                     self.stem_controls[f"stem_{i}"] = stem_control
+                    self._ordered_stem_controls.append(stem_control)
                     yield stem_control
                 
                 # Reset button
@@ -330,6 +404,7 @@ class StreamSeparatorTUI(App):
                     id="chunk_secs"
                 )
                 self.sliders["chunk_secs"] = chunk_slider
+                self._setting_sliders.append(("chunk_secs", chunk_slider.slider))
                 yield chunk_slider
                 
                 # Overlap slider
@@ -343,6 +418,7 @@ class StreamSeparatorTUI(App):
                     id="overlap_secs"
                 )
                 self.sliders["overlap_secs"] = overlap_slider
+                self._setting_sliders.append(("overlap_secs", overlap_slider.slider))
                 yield overlap_slider
                 
                 # Device selection
@@ -377,82 +453,129 @@ class StreamSeparatorTUI(App):
     def on_radio_set_changed(self, event: RadioSet.Changed) -> None:
         """Handle device selection change."""
         if event.radio_set.id == "device":
-            self.config.device = "cuda" if event.index == 1 else "cpu"
+            device = "cuda" if event.index == 1 else "cpu"
+            if device != self.config.device:
+                self.config.device = device
+                self._dirty = True
             self.save_config_throttled()
     
     def on_input_changed(self, event: Input.Changed) -> None:
         """Handle input field changes."""
         if event.input.id == "checkpoint":
-            self.config.checkpoint = event.value
+            if event.value != self.config.checkpoint:
+                self.config.checkpoint = event.value
+                self._dirty = True
             self.save_config_throttled()
     
     def on_checkbox_changed(self, event: Checkbox.Changed) -> None:
         """Handle checkbox changes."""
         if event.checkbox.id == "normalize":
-            self.config.normalize = event.value
+            if event.value != self.config.normalize:
+                self.config.normalize = event.value
+                self._dirty = True
             self.save_config_throttled()
     
     def on_button_pressed(self, event: Button.Pressed) -> None:
         """Handle button presses."""
-        if event.button.id == "save-button":
-            self.save_config()
-            self.notify("Configuration saved!")
-        elif event.button.id == "reset-volumes":
-            self.reset_all_volumes()
-        elif event.button.id == "empty-queues":
-            self.empty_queues()
-        elif event.button.id.startswith("mute_"):
-            stem_index = int(event.button.id.split("_")[1])
-            self.toggle_mute(stem_index)
-        elif event.button.id.startswith("solo_"):
-            stem_index = int(event.button.id.split("_")[1])
-            self.toggle_solo(stem_index)
+        handler = self._button_dispatch.get(event.button.id)
+        if handler is not None:
+            handler()
+
+    def save_config_now(self) -> None:
+        """Explicitly save the configuration, even if nothing changed."""
+        self._dirty = True
+        self.save_config()
+        self.notify("Configuration saved!")
 
     def on_mount(self) -> None:
         # Poll stats every second
         self.set_interval(1.0, self.refresh_stats)
     
     def save_config_throttled(self) -> None:
-        """Save config with throttling to prevent excessive writes during slider drags."""
-        current_time = time.time()
-        if current_time - self.last_save_time >= self.save_delay:
+        """Save config with throttling to prevent excessive writes during slider drags.
+
+        The first change saves immediately, then a burst of changes is coalesced
+        into a single trailing save by restarting one pending timer.
+        """
+        if self._pending_timer is not None:
+            self._pending_timer.stop()
+        elif time.time() - self.last_save_time >= self.save_delay:
             self.save_config()
-            self.last_save_time = current_time
-        else:
-            # Schedule a delayed save
-            self.set_timer(self.save_delay, self._delayed_save)
+            return
+        self._pending_timer = self.set_timer(self.save_delay, self._delayed_save)
     
     def _delayed_save(self) -> None:
         """Callback for delayed save timer."""
+        self._pending_timer = None
         self.save_config()
     
-    def save_config(self) -> None:
-        """Save the current configuration."""
+    def save_config(self, blocking: bool = False) -> None:
+        """Save the current configuration, skipping the write if nothing changed.
+
+        The write happens on a worker thread unless blocking is set, so the fsync
+        doesn't stall input handling. Writes run one at a time, and a newer save
+        supersedes a queued one.
+        """
         # Update gains from stem controls
-        for i in range(4):
-            stem_id = f"stem_{i}"
-            if stem_id in self.stem_controls:
-                self.config.gains[i] = self.stem_controls[stem_id].value
+        for i, stem_control in enumerate(self._ordered_stem_controls):
+            value = stem_control.value
+            if value != self.config.gains[i]:
+                self.config.set_gain(i, value)
+                self._dirty = True
         
         # Update other settings from sliders
-        if "chunk_secs" in self.sliders:
-            self.config.chunk_secs = self.sliders["chunk_secs"].value
-        if "overlap_secs" in self.sliders:
-            self.config.overlap_secs = self.sliders["overlap_secs"].value
+        for key, slider in self._setting_sliders:
+            value = slider.value
+            if value != getattr(self.config, key):
+                setattr(self.config, key, value)
+                self._dirty = True
         
-        # Save to file
-        self.config.save()
+        if not self._dirty:
+            return
+
+        if blocking:
+            self._write_now(self.config.save)
+        else:
+            # Queue a snapshot so later edits can't race with serialization
+            with self._save_lock:
+                self._queued_save = copy.deepcopy(self.config)
+                start_worker = not self._save_worker_running
+                self._save_worker_running = True
+            if start_worker:
+                self.run_worker(self._write_queued_saves, thread=True, group="config-save")
+        self._dirty = False
         self.last_save_time = time.time()
     
+    def _write_queued_saves(self) -> None:
+        """Save worker: write the newest queued snapshot until none is left."""
+        while True:
+            with self._save_lock:
+                snapshot = self._queued_save
+                self._queued_save = None
+                if snapshot is None:
+                    self._save_worker_running = False
+                    return
+            with self._write_lock:
+                snapshot.save()
+
+    def _write_now(self, save: Callable[[], None]) -> None:
+        """Run save on this thread after any write in flight, dropping the queued snapshot.
+
+        The queued snapshot is a copy of self.config, so saving self.config covers it.
+        """
+        with self._save_lock:
+            self._queued_save = None
+        with self._write_lock:
+            save()
+
     def reset_all_volumes(self) -> None:
         """Reset all volumes to 100% and clear mute/solo state."""
         self.config.reset_volumes()
+        self._dirty = True
         
-        # Update UI to reflect changes
-        for i in range(4):
-            stem_id = f"stem_{i}"
-            if stem_id in self.stem_controls:
-                stem_control = self.stem_controls[stem_id]
+        # Update UI to reflect changes, repainting once at the end
+        with self.batch_update():
+            for stem_control in self._ordered_stem_controls:
                 stem_control.value = 100.0
                 stem_control.muted = False
                 stem_control.soloed = False
@@ -462,12 +585,13 @@ class StreamSeparatorTUI(App):
     
     def empty_queues(self) -> None:
         """Request emptying of audio processing queues."""
-        self.config.request_empty_queues()
+        self._write_now(self.config.request_empty_queues)
         self.notify("Queue emptying requested")
     
     def toggle_mute(self, stem_index: int) -> None:
         """Toggle mute state for a stem."""
         self.config.toggle_mute(stem_index)
+        self._dirty = True
         
         # Update UI
         stem_id = f"stem_{stem_index}"
@@ -480,28 +604,31 @@ class StreamSeparatorTUI(App):
     def toggle_solo(self, stem_index: int) -> None:
         """Toggle solo state for a stem."""
         self.config.toggle_solo(stem_index)
+        self._dirty = True
         
         # Update UI for all stems (solo affects all other stems)
-        for i in range(4):
-            stem_id = f"stem_{i}"
-            if stem_id in self.stem_controls:
-                self.stem_controls[stem_id].muted = self.config.muted[i]
-                self.stem_controls[stem_id].soloed = self.config.soloed[i]
+        with self.batch_update():
+            for i, stem_control in enumerate(self._ordered_stem_controls):
+                stem_control.muted = self.config.muted[i]
+                stem_control.soloed = self.config.soloed[i]
         
         self.save_config()
     
     def action_quit(self) -> None:
         """Quit the application."""
-        self.save_config()
+        if self._pending_timer is not None:
+            self._pending_timer.stop()
+            self._pending_timer = None
+        self.save_config(blocking=True)
         self.exit()
 
     # --- Stats helpers ---
     def refresh_stats(self) -> None:
-        import json, time as _time
+        import time as _time
         try:
             args = self.config  # Args.read() would reload file; we just need stats_path
-            with open(args.stats_path, 'r') as f:
-                stats = json.load(f)
+            with open(args.stats_path, 'rb') as f:
+                stats = json_loads(f.read())
         except Exception:
             stats = {}
 
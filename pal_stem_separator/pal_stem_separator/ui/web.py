@@ -7,21 +7,32 @@ the same JSON config as the TUI. Runs on localhost and prints the URL.
 """
 
 from starlette.applications import Starlette
-from starlette.responses import JSONResponse, HTMLResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response, StreamingResponse
 from starlette.requests import Request
-from starlette.routing import Route
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
 import uvicorn
-import json
+import asyncio
+import contextlib
+import gzip
+import hashlib
 import os
+import shutil
 import threading
 import time
-import webbrowser
 
 from pal_stem_separator.stream_separator_args import Args
+from pal_stem_separator.stream_separator_utils import file_signature, json_dumps, json_loads
 import subprocess
 import signal
 
 
+def _json_response(data, status_code: int = 200) -> Response:
+    """A JSON response encoded with the orjson-backed json_dumps rather than stdlib json."""
+    return Response(json_dumps(data), status_code=status_code, media_type="application/json")
+
+
 def _serialize_args(args: Args) -> dict:
     return {
         "gains": args.gains,
@@ -35,95 +46,264 @@ def _serialize_args(args: Args) -> dict:
     }
 
 
+# Quiet period after the last UI change before the config is written
+SAVE_DEBOUNCE_SECS = 0.25
+
+# In-memory config the UI edits, with the signature of the config file it matches
+_ui_args = None
+_ui_args_signature = None
+# Pending debounced save, if any
+_save_handle = None
+# Encoded /api/config body for _ui_args, dropped whenever it changes
+_config_body = None
+# Bumped on every change to _ui_args; with a per-process prefix it makes the /api/config ETag
+_config_version = 0
+_ETAG_PREFIX = f"{os.getpid()}-{time.time_ns()}"
+
+
+def _config_changed():
+    global _config_body, _config_version
+    _config_body = None
+    _config_version += 1
+
+
+def _config_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return file_signature(stat)
+
+
+def _current_args() -> Args:
+    """The UI's config, re-read only if the file changed and we have nothing unsaved."""
+    global _ui_args, _ui_args_signature
+    signature = _config_signature(Args.get_config_json_path())
+    if _ui_args is None or (_save_handle is None and signature != _ui_args_signature):
+        _ui_args = Args.read()
+        _ui_args_signature = signature
+        _config_changed()
+    return _ui_args
+
+
+def _flush_save():
+    global _save_handle, _ui_args_signature
+    if _save_handle is not None:
+        _save_handle.cancel()
+        _save_handle = None
+    if _ui_args is not None:
+        _ui_args.save()
+        _ui_args_signature = _config_signature(_ui_args.config_path)
+
+
+def _schedule_save():
+    """Coalesce rapid changes (e.g. slider drags) into a single write."""
+    global _save_handle
+    if _save_handle is not None:
+        _save_handle.cancel()
+    _save_handle = asyncio.get_running_loop().call_later(SAVE_DEBOUNCE_SECS, _flush_save)
+
+
+def _encoded_config(args: Args) -> bytes:
+    global _config_body
+    if _config_body is None:
+        _config_body = json_dumps(_serialize_args(args))
+    return _config_body
+
+
 async def get_config(request: Request):
-    args = Args.read()
-    return JSONResponse(_serialize_args(args))
+    args = _current_args()
+    # Answer repeat requests for an unchanged config with a bodyless 304
+    etag = f'W/"{_ETAG_PREFIX}-{_config_version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(_encoded_config(args), media_type="application/json", headers=headers)
 
 
-async def update_config(request: Request):
-    args = Args.read()
-    payload = await request.json()
-    action = payload.get("action")
+# Actions that just set a value the page already knows, so replies can omit the config
+_VALUE_ACTIONS = ("set_gain", "set_chunk", "set_overlap", "set_device", "set_normalize", "set_checkpoint")
+
+# Commands that are saved straight away rather than debounced
+_IMMEDIATE_ACTIONS = ("reset_volumes", "empty_queues")
 
+
+def _set_gain(args: Args, payload):
+    args.set_gain(int(payload["index"]), max(0.0, min(200.0, float(payload["value"]))))
+
+
+def _set_device(args: Args, payload):
+    args.device = "cuda" if payload["value"].lower() == "cuda" else "cpu"
+
+
+def _set_field(name, convert):
+    """Handler that sets a single config field from payload["value"]."""
+    def handler(args: Args, payload):
+        setattr(args, name, convert(payload["value"]))
+    return handler
+
+
+# Update actions by name, each applied as handler(args, payload)
+_HANDLERS = {
+    "set_gain": _set_gain,
+    "mute_toggle": lambda args, payload: args.toggle_mute(int(payload["index"])),
+    "solo_toggle": lambda args, payload: args.toggle_solo(int(payload["index"])),
+    "set_chunk": _set_field("chunk_secs", float),
+    "set_overlap": _set_field("overlap_secs", float),
+    "set_device": _set_device,
+    "set_normalize": _set_field("normalize", bool),  # payload may be true/false
+    "set_checkpoint": _set_field("checkpoint", str),
+    "reset_volumes": lambda args, payload: args.reset_volumes(),
+    "empty_queues": lambda args, payload: args.request_empty_queues(),
+}
+
+
+def _apply_action(args: Args, action, payload):
+    handler = _HANDLERS.get(action)
+    if handler is None:
+        raise ValueError(f"Unknown action: {action}")
+    handler(args, payload)
+
+
+def _handle_update(payload) -> tuple[int, bytes]:
+    """Apply an update (a single op or a batch), returning the status and encoded reply."""
+    # Handlers run on the single server event loop and nothing here awaits,
+    # so each update is applied atomically without a lock
+    if not isinstance(payload, dict):
+        return 400, json_dumps({"error": "Update must be a JSON object"})
+    # A batch carries several controls' changes in one request and one save
+    ops = payload.get("ops", []) if payload.get("action") == "batch" else [payload]
+    if not isinstance(ops, list) or not all(isinstance(op, dict) for op in ops):
+        return 400, json_dumps({"error": "Batch ops must be a list of JSON objects"})
+
+    args = _current_args()
     try:
-        if action == "set_gain":
-            i = int(payload["index"])
-            v = float(payload["value"])
-            args.gains[i] = max(0.0, min(200.0, v))
-        elif action == "mute_toggle":
-            i = int(payload["index"])
-            args.toggle_mute(i)
-        elif action == "solo_toggle":
-            i = int(payload["index"])
-            args.toggle_solo(i)
-        elif action == "set_chunk":
-            args.chunk_secs = float(payload["value"])
-        elif action == "set_overlap":
-            args.overlap_secs = float(payload["value"])
-        elif action == "set_device":
-            val = payload["value"].lower()
-            args.device = "cuda" if val == "cuda" else "cpu"
-        elif action == "set_normalize":
-            args.normalize = bool(payload["value"])  # payload may be true/false
-        elif action == "set_checkpoint":
-            args.checkpoint = str(payload["value"])
-        elif action == "reset_volumes":
-            args.reset_volumes()
-        elif action == "empty_queues":
-            args.request_empty_queues()
+        for op in ops:
+            _apply_action(args, op.get("action"), op)
+    except Exception as e:
+        return 400, json_dumps({"error": str(e)})
+    finally:
+        # Earlier ops of a failed batch may still have been applied
+        _config_changed()
+        # One-off commands take effect straight away; continuous controls are debounced
+        if any(op.get("action") in _IMMEDIATE_ACTIONS for op in ops):
+            _flush_save()
         else:
-            return JSONResponse({"error": f"Unknown action: {action}"}, status_code=400)
+            _schedule_save()
 
-        args.save()
-        return JSONResponse({"ok": True, "config": _serialize_args(args)})
-    except Exception as e:
-        return JSONResponse({"error": str(e)}, status_code=400)
+    # The page already applied plain value changes itself, so only send the
+    # config back when an op's outcome depends on server-side state
+    if all(op.get("action") in _VALUE_ACTIONS for op in ops):
+        return 200, b'{"ok":true}'
+    # Splice the encoded config in so it's encoded once and reused by get_config
+    return 200, b'{"ok":true,"config":' + _encoded_config(args) + b'}'
+
+
+async def update_config(request: Request):
+    status_code, body = _handle_update(json_loads(await request.body()))
+    return Response(body, status_code=status_code, media_type="application/json")
+
+
+async def ws_updates(websocket: WebSocket):
+    """Same updates as /api/update over one persistent connection per page."""
+    await websocket.accept()
+    try:
+        while True:
+            try:
+                payload = json_loads(await websocket.receive_text())
+            except ValueError as e:
+                await websocket.send_text(json_dumps({"error": str(e)}).decode())
+                continue
+            _, body = _handle_update(payload)
+            await websocket.send_text(body.decode())
+    except WebSocketDisconnect:
+        pass
 
 
 async def get_stats(request: Request):
-    args = Args.read()
     try:
-        with open(args.stats_path, "r") as f:
-            data = json.load(f)
+        # Only the path is needed, so don't read the config to get it
+        with open(Args.get_stats_json_path(), "rb") as f:
+            # The file is rewritten when stats change, so its signature tags its contents
+            signature = "-".join(f"{v:x}" for v in file_signature(os.fstat(f.fileno())))
+            etag = f'W/"{signature}"'
+            headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=304, headers=headers)
+            # The stats file is already JSON, so pass it through without a parse/encode round trip
+            body = f.read()
     except FileNotFoundError:
-        data = {}
-    return JSONResponse(data)
+        return Response(b"{}", media_type="application/json")
+    return Response(body, media_type="application/json", headers=headers)
 
 # --- Service control and logs ---
 
+# Arguments that identify the service, compared as raw bytes
+_SERVICE_ARGS = frozenset((b"pal-stem-separator", b"stem-separator", b"stem-separator --debug"))
+# An argument ending in this is the service run by path (i.e. its basename is pal-stem-separator)
+_SERVICE_PATH_SUFFIX = b"/pal-stem-separator"
+
+
 def _service_cmdlines_match(cmdline: bytes) -> bool:
-    try:
-        parts = [p for p in cmdline.split(b"\x00") if p]
-        for p in parts:
-            s = p.decode(errors="ignore")
-            base = os.path.basename(s)
-            if base == "pal-stem-separator" or s.endswith("/pal-stem-separator"):
-                return True
-            if s == "stem-separator" or s == "stem-separator --debug":
-                return True
-    except Exception:
-        pass
+    # Nearly every process fails this, so reject them before splitting
+    if b"stem-separator" not in cmdline:
+        return False
+    for p in cmdline.split(b"\x00"):
+        if p in _SERVICE_ARGS or p.endswith(_SERVICE_PATH_SUFFIX):
+            return True
     return False
 
 
 def _find_service_pids() -> list[int]:
     pids: list[int] = []
     try:
-        for e in os.scandir("/proc"):
-            if not e.is_dir() or not e.name.isdigit():
-                continue
-            try:
-                with open(os.path.join("/proc", e.name, "cmdline"), "rb") as f:
-                    if _service_cmdlines_match(f.read()):
+        # Open each cmdline relative to /proc and read it raw: one openat/read/close per
+        # process, without re-resolving /proc or the buffered file object's extra syscalls
+        proc_fd = os.open("/proc", os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return pids
+    # Each cmdline is read into this one buffer so most non-matching processes allocate nothing
+    buf = bytearray(4096)
+    try:
+        with os.scandir(proc_fd) as entries:
+            for e in entries:
+                if not e.name.isdigit():
+                    continue
+                try:
+                    fd = os.open(f"{e.name}/cmdline", os.O_RDONLY, dir_fd=proc_fd)
+                except OSError:
+                    continue
+                try:
+                    n = os.readv(fd, (buf,))
+                    # Read on to EOF, as a cmdline with long arguments (e.g. store paths) won't fit
+                    tail = b""
+                    while n and (chunk := os.read(fd, 65536)):
+                        tail += chunk
+                except OSError:
+                    continue
+                finally:
+                    os.close(fd)
+                if tail:
+                    if _service_cmdlines_match(bytes(buf[:n]) + tail):
                         pids.append(int(e.name))
-            except Exception:
-                continue
+                # Copy out only the few cmdlines that could match
+                elif buf.find(b"stem-separator", 0, n) != -1 and _service_cmdlines_match(bytes(buf[:n])):
+                    pids.append(int(e.name))
     except Exception:
         pass
+    finally:
+        os.close(proc_fd)
     return pids
 
 
-def _service_running() -> bool:
+# How long a service status check is reused, so bursts of polls share one /proc scan
+SERVICE_STATUS_TTL_SECS = 0.5
+# (checked_at, running) from the last check; reset to force a fresh one
+_service_status = (0.0, False)
+_service_status_lock = threading.Lock()
+
+
+def _check_service_running() -> bool:
     if _find_service_pids():
         return True
     try:
@@ -133,12 +313,31 @@ def _service_running() -> bool:
         return False
 
 
+def _service_running() -> bool:
+    global _service_status
+    with _service_status_lock:
+        checked_at, running = _service_status
+        now = time.monotonic()
+        if now - checked_at >= SERVICE_STATUS_TTL_SECS:
+            running = _check_service_running()
+            _service_status = (now, running)
+        return running
+
+
+def _invalidate_service_status():
+    global _service_status
+    with _service_status_lock:
+        _service_status = (0.0, False)
+
+
 def _start_service():
     try:
         subprocess.Popen(["pulseaudio-lambda", "pal-stem-separator"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL, start_new_session=True)
         return True
     except Exception:
         return False
+    finally:
+        _invalidate_service_status()
 
 
 def _stop_service():
@@ -149,58 +348,165 @@ def _stop_service():
             sent = True
         except Exception:
             pass
-    try:
-        subprocess.Popen(["pkill", "-f", "pal-stem-separator$"])  # nosec
-        sent = True
-    except Exception:
-        pass
+    # The /proc scan already covers the usual case; pkill is only a fallback
+    # for processes it couldn't see (e.g. an unreadable cmdline)
+    if not sent:
+        try:
+            # pkill exits 0 only if it signalled something
+            result = subprocess.run(["pkill", "-f", "pal-stem-separator$"], timeout=1.0)  # nosec
+            sent = result.returncode == 0
+        except Exception:
+            pass
+    _invalidate_service_status()
     return sent
 
 
 async def service_status(request: Request):
-    return JSONResponse({"running": _service_running()})
+    # A cache miss scans /proc, so keep it off the event loop
+    return _json_response({"running": await run_in_threadpool(_service_running)})
 
 
 async def service_action(request: Request):
     try:
-        payload = await request.json()
+        payload = json_loads(await request.body())
     except Exception:
         payload = {}
     action = (payload.get("action") or "").lower()
+    # These scan /proc and may run pkill/pgrep, so keep them off the event loop
     if action == "start":
-        ok = _start_service()
-        return JSONResponse({"ok": ok, "running": _service_running()})
+        ok = await run_in_threadpool(_start_service)
+        return _json_response({"ok": ok, "running": await run_in_threadpool(_service_running)})
     if action == "stop":
-        ok = _stop_service()
-        return JSONResponse({"ok": ok, "running": _service_running()})
-    return JSONResponse({"error": "unknown action"}, status_code=400)
+        ok = await run_in_threadpool(_stop_service)
+        return _json_response({"ok": ok, "running": await run_in_threadpool(_service_running)})
+    return _json_response({"error": "unknown action"}, status_code=400)
 
 
-async def get_logs(request: Request):
+# Most log bytes returned per request, and the backfill size for a fresh view
+LOG_READ_BYTES = 65536
+
+
+def _log_path():
     args = Args.get_live() if hasattr(Args, 'get_live') else Args.read()
     config_dir = Args.get_config_dir(args)
-    log_path = os.path.join(config_dir, "stream_separator.log")
-    try:
-        q = request.query_params
-        offset = int(q.get("offset", "0"))
-    except Exception:
-        offset = 0
-    data = ""
+    return os.path.join(config_dir, "stream_separator.log")
+
+
+def _read_log(log_path, offset):
+    """_read_log_bytes, decoded to text."""
+    chunk, new_offset = _read_log_bytes(log_path, offset)
+    return chunk.decode(errors="ignore"), new_offset
+
+
+def _read_log_bytes(log_path, offset):
+    """Read new log bytes from offset, returning them with the offset to continue from."""
+    chunk = b""
     new_offset = offset
     try:
         with open(log_path, "rb") as f:
             f.seek(0, os.SEEK_END)
             end = f.tell()
-            if offset < 0 or offset > end:
-                offset = max(0, end - 8192)
+            # A fresh view only backfills the last window, starting on a line boundary
+            if offset <= 0 or offset > end:
+                offset = max(0, end - LOG_READ_BYTES)
+                if offset > 0:
+                    f.seek(offset)
+                    offset += len(f.readline())
             f.seek(offset)
-            chunk = f.read()
-            data = chunk.decode(errors="ignore")
+            # Bound each reply; the page polls again for the rest
+            chunk = f.read(LOG_READ_BYTES)
+            if len(chunk) == LOG_READ_BYTES and b"\n" in chunk:
+                # Stop at a line end so no line or character is split across replies
+                chunk = chunk[:chunk.rindex(b"\n") + 1]
             new_offset = offset + len(chunk)
     except FileNotFoundError:
-        data = ""
         new_offset = 0
-    return JSONResponse({"data": data, "offset": new_offset})
+    return chunk, new_offset
+
+
+# Log replies smaller than this aren't worth compressing
+LOG_GZIP_MIN_BYTES = 512
+
+
+def _log_response(request: Request, body: bytes, media_type: str, headers=None) -> Response:
+    """Log text compresses well, so gzip larger replies for clients that accept it."""
+    headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    if len(body) >= LOG_GZIP_MIN_BYTES and "gzip" in request.headers.get("accept-encoding", ""):
+        # The lowest level still gets most of the gain on repetitive log lines
+        body = gzip.compress(body, 1)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, media_type=media_type, headers=headers)
+
+
+async def get_logs(request: Request):
+    try:
+        q = request.query_params
+        offset = int(q.get("offset", "0"))
+    except Exception:
+        offset = 0
+    data, new_offset = _read_log(_log_path(), offset)
+    return _log_response(request, json_dumps({"data": data, "offset": new_offset}), "application/json")
+
+
+async def get_logs_raw(request: Request):
+    """Like /api/logs, but the log bytes are the body and the next offset is a header.
+
+    Skips decoding and JSON-escaping, which matters most for the initial backfill.
+    """
+    try:
+        offset = int(request.query_params.get("offset", "0"))
+    except ValueError:
+        offset = 0
+    chunk, new_offset = _read_log_bytes(_log_path(), offset)
+    return _log_response(request, chunk, "text/plain; charset=utf-8", {"X-Next-Offset": str(new_offset)})
+
+
+# Seconds between frames on the /api/events stream
+EVENTS_INTERVAL_SECS = 1.0
+# The running uvicorn server, so open event streams can end when it shuts down
+_server = None
+
+
+async def events(request: Request):
+    """Stream stats, service state, config changes and (with ?logs=1) new log text as Server-Sent Events.
+
+    One long-lived response per page replaces separate stats, service, config and log polling.
+    """
+    q = request.query_params
+    follow_logs = q.get("logs") == "1"
+    try:
+        log_offset = int(q.get("offset", "0"))
+    except ValueError:
+        log_offset = 0
+    stats_path = Args.get_stats_json_path()
+    log_path = _log_path() if follow_logs else None
+
+    async def stream():
+        nonlocal log_offset
+        # The config is sent in the first frame and then only when it changes,
+        # whether through an update or an edit elsewhere (e.g. the TUI)
+        sent_config_version = None
+        # uvicorn waits for open responses before exiting, so stop once it's shutting down
+        while not (_server is not None and _server.should_exit) and not await request.is_disconnected():
+            try:
+                with open(stats_path, "rb") as f:
+                    stats = json_loads(f.read())
+            except (OSError, ValueError):
+                # Missing, or caught mid-write; the next frame will have it
+                stats = None
+            # Clients share the cached status; a miss scans /proc, so do it off the event loop
+            frame = {"stats": stats, "service": await run_in_threadpool(_service_running)}
+            args = _current_args()
+            if _config_version != sent_config_version:
+                frame["config"] = _serialize_args(args)
+                sent_config_version = _config_version
+            if follow_logs:
+                data, log_offset = _read_log(log_path, log_offset)
+                frame["log"] = {"data": data, "offset": log_offset}
+            yield b"data: " + json_dumps(frame) + b"\n\n"
+            await asyncio.sleep(EVENTS_INTERVAL_SECS)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 
 HTML = """
@@ -231,10 +537,13 @@ HTML = """
   </style>
   <script>
     let config = null;
-    let saveTimer = null;
+    let pendingOps = {};
+    let flushTimer = null;
+    let ws = null;
     let prevStats = null;
     let prevStatsAt = 0;
     let statsHist = []; // { t, in, out, proc }
+    let statsHead = 0; // index of the oldest sample still in the window
 
     async function loadConfig() {
       const r = await fetch('/api/config');
@@ -247,48 +556,103 @@ HTML = """
       if (msg) setTimeout(() => setStatus(''), 1500);
     }
 
+    // Sends the given op along with any queued ones, in order, as one batch
     async function send(action, payload) {
-      const r = await fetch('/api/update', { method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify({ action, ...payload }) });
-      const data = await r.json();
-      if (data.ok) { config = data.config; render(); setStatus('Saved'); } else { setStatus(data.error || 'Error'); }
+      const ops = Object.values(pendingOps);
+      pendingOps = {};
+      if (flushTimer) { clearTimeout(flushTimer); flushTimer = null; }
+      if (action) ops.push({ action, ...payload });
+      if (!ops.length) return;
+      if (config) { ops.forEach(applyLocally); render(); }
+      const body = JSON.stringify({ action: 'batch', ops });
+      if (ws && ws.readyState === WebSocket.OPEN) { ws.send(body); return; }
+      const r = await fetch('/api/update', { method: 'POST', headers: {'Content-Type': 'application/json'}, body });
+      onUpdateReply(await r.json());
+    }
+
+    function onUpdateReply(data) {
+      if (data.ok) {
+        // Plain value changes are acknowledged without the config, which was already updated locally
+        if (data.config) { config = data.config; render(); }
+        setStatus('Saved');
+      } else {
+        setStatus(data.error || 'Error');
+        loadConfig();
+      }
     }
 
-    function onGainChange(i, v) { debounce(() => send('set_gain', { index: i, value: v }), 150); }
+    // Mirror the server's handling of value-setting ops, so their replies needn't carry the config
+    function applyLocally(op) {
+      switch (op.action) {
+        case 'set_gain': config.gains[op.index] = Math.max(0, Math.min(200, Number(op.value))); break;
+        case 'set_chunk': config.chunk_secs = Number(op.value); break;
+        case 'set_overlap': config.overlap_secs = Number(op.value); break;
+        case 'set_device': config.device = op.value === 'cuda' ? 'cuda' : 'cpu'; break;
+        case 'set_normalize': config.normalize = !!op.value; break;
+        case 'set_checkpoint': config.checkpoint = String(op.value); break;
+      }
+    }
+
+    // Send updates over a WebSocket when the server supports it, falling back to POST
+    function connectWs() {
+      const sock = new WebSocket((location.protocol === 'https:' ? 'wss://' : 'ws://') + location.host + '/ws');
+      sock.onopen = () => { ws = sock; };
+      sock.onmessage = (e) => onUpdateReply(JSON.parse(e.data));
+      // Only reconnect a socket that worked, so a server without WebSocket support isn't retried
+      sock.onclose = () => { const wasOpen = ws === sock; if (wasOpen) { ws = null; setTimeout(connectWs, 1000); } };
+    }
+
+    function onGainChange(i, v) { debounce('gain_'+i, 'set_gain', { index: i, value: v }, 150); }
     function onMute(i) { send('mute_toggle', { index: i }); }
     function onSolo(i) { send('solo_toggle', { index: i }); }
-    function onChunk(v) { debounce(() => send('set_chunk', { value: v }), 150); }
-    function onOverlap(v) { debounce(() => send('set_overlap', { value: v }), 150); }
+    function onChunk(v) { debounce('chunk', 'set_chunk', { value: v }, 150); }
+    function onOverlap(v) { debounce('overlap', 'set_overlap', { value: v }, 150); }
     function onDevice(v) { send('set_device', { value: v }); }
     function onNormalize(v) { send('set_normalize', { value: v }); }
-    function onCheckpoint(v) { debounce(() => send('set_checkpoint', { value: v }), 300); }
+    function onCheckpoint(v) { debounce('checkpoint', 'set_checkpoint', { value: v }, 300); }
     function resetVolumes() { send('reset_volumes', {}); }
     function emptyQueues() { send('empty_queues', {}); }
 
-    function debounce(fn, ms) {
-      if (saveTimer) clearTimeout(saveTimer);
-      saveTimer = setTimeout(fn, ms);
+    // Keep the latest op per control and flush them together once all controls settle
+    function debounce(key, action, payload, ms) {
+      pendingOps[key] = { action, ...payload };
+      if (flushTimer) clearTimeout(flushTimer);
+      flushTimer = setTimeout(() => { flushTimer = null; send(); }, ms);
+    }
+
+    // Values last written to the DOM, so render() only touches what changed
+    const rendered = {};
+    function changed(key, value) {
+      if (rendered[key] === value) return false;
+      rendered[key] = value;
+      return true;
+    }
+
+    // Set an input's value unless the user is currently dragging or typing in it
+    function setInput(id, value) {
+      const el = document.getElementById(id);
+      if (document.activeElement === el) { delete rendered[id]; return; }
+      if (changed(id, value)) el.value = value;
     }
 
     function render() {
       if (!config) return;
       for (let i=0;i<4;i++) {
-        const g = document.getElementById('gain_'+i);
-        const gl = document.getElementById('gain_label_'+i);
-        const m = document.getElementById('mute_'+i);
-        const s = document.getElementById('solo_'+i);
-        g.value = config.gains[i];
-        gl.textContent = Math.round(config.gains[i]) + '%';
-        m.classList.toggle('muted', !!config.muted[i]);
-        s.classList.toggle('solo', !!config.soloed[i]);
+        setInput('gain_'+i, config.gains[i]);
+        if (changed('gain_label_'+i, config.gains[i])) document.getElementById('gain_label_'+i).textContent = Math.round(config.gains[i]) + '%';
+        if (changed('mute_'+i, !!config.muted[i])) document.getElementById('mute_'+i).classList.toggle('muted', !!config.muted[i]);
+        if (changed('solo_'+i, !!config.soloed[i])) document.getElementById('solo_'+i).classList.toggle('solo', !!config.soloed[i]);
       }
-      document.getElementById('chunk_secs').value = config.chunk_secs;
-      document.getElementById('chunk_label').textContent = config.chunk_secs.toFixed(1);
-      document.getElementById('overlap_secs').value = config.overlap_secs;
-      document.getElementById('overlap_label').textContent = config.overlap_secs.toFixed(1);
-      document.getElementById('device_cpu').checked = config.device === 'cpu';
-      document.getElementById('device_cuda').checked = config.device === 'cuda';
-      document.getElementById('normalize').checked = !!config.normalize;
-      document.getElementById('checkpoint').value = config.checkpoint || '';
+      setInput('chunk_secs', config.chunk_secs);
+      if (changed('chunk_label', config.chunk_secs)) document.getElementById('chunk_label').textContent = config.chunk_secs.toFixed(1);
+      setInput('overlap_secs', config.overlap_secs);
+      if (changed('overlap_label', config.overlap_secs)) document.getElementById('overlap_label').textContent = config.overlap_secs.toFixed(1);
+      if (changed('device', config.device)) {
+        document.getElementById('device_cpu').checked = config.device === 'cpu';
+        document.getElementById('device_cuda').checked = config.device === 'cuda';
+      }
+      if (changed('normalize', !!config.normalize)) document.getElementById('normalize').checked = !!config.normalize;
+      setInput('checkpoint', config.checkpoint || '');
     }
 
     // --- Service ---
@@ -296,26 +660,56 @@ HTML = """
       try {
         const r = await fetch('/api/service/status');
         const s = await r.json();
-        const svc = document.getElementById('svc_state');
-        const btn = document.getElementById('svc_btn');
-        if (s.running) { svc.textContent='Running'; svc.style.color='#22c55e'; btn.textContent='Stop'; btn.onclick=stopService; }
-        else { svc.textContent='Stopped'; svc.style.color='#ef4444'; btn.textContent='Start'; btn.onclick=startService; }
+        updateService(s.running);
       } catch {}
     }
+    function updateService(running) {
+      if (!changed('service', running)) return;
+      const svc = document.getElementById('svc_state');
+      const btn = document.getElementById('svc_btn');
+      if (running) { svc.textContent='Running'; svc.style.color='#22c55e'; btn.textContent='Stop'; btn.onclick=stopService; }
+      else { svc.textContent='Stopped'; svc.style.color='#ef4444'; btn.textContent='Start'; btn.onclick=startService; }
+    }
     async function startService() { await fetch('/api/service', { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({action:'start'})}); refreshService(); showLogs(); }
     async function stopService() { await fetch('/api/service', { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({action:'stop'})}); refreshService(); }
 
     // --- Logs ---
     let logOffset = 0;
-    let logsTimer = null;
+    let logsShown = false;
     let followTail = true;
     function toggleLogs() { const wrap = document.getElementById('logs_wrap'); const btn = document.getElementById('logs_btn'); if (wrap.style.display==='none') { showLogs(); } else { hideLogs(); } }
-    function showLogs() { const wrap = document.getElementById('logs_wrap'); wrap.style.display='block'; document.getElementById('logs_btn').textContent='Hide Logs'; followTail=true; if (!logsTimer) { pollLogs(); logsTimer=setInterval(pollLogs, 1000); } }
-    function hideLogs() { const wrap = document.getElementById('logs_wrap'); wrap.style.display='none'; document.getElementById('logs_btn').textContent='Show Logs'; if (logsTimer) { clearInterval(logsTimer); logsTimer=null; } }
-    async function pollLogs() { try { const r = await fetch(`/api/logs?offset=${logOffset}`); const data = await r.json(); const el = document.getElementById('logs'); const atBottom=(el.scrollTop+el.clientHeight)>=(el.scrollHeight-2); if (data.data && data.data.length) { el.textContent += data.data; } logOffset = data.offset||logOffset; if (followTail && (atBottom || el.textContent.length===0)) { el.scrollTop=el.scrollHeight; } } catch {} }
+    function showLogs() { const wrap = document.getElementById('logs_wrap'); wrap.style.display='block'; document.getElementById('logs_btn').textContent='Hide Logs'; followTail=true; if (!logsShown) { logsShown=true; backfillLogs().finally(connectEvents); } }
+    function hideLogs() { const wrap = document.getElementById('logs_wrap'); wrap.style.display='none'; document.getElementById('logs_btn').textContent='Show Logs'; if (logsShown) { logsShown=false; connectEvents(); } }
+    // Fetch the backlog as plain bytes, then the event stream carries on from its end
+    async function backfillLogs() {
+      try {
+        const r = await fetch(`/api/logs/raw?offset=${logOffset}`);
+        const next = Number(r.headers.get('X-Next-Offset'));
+        appendLog({ data: await r.text(), offset: next });
+      } catch {}
+    }
+    function appendLog(data) { const el = document.getElementById('logs'); const atBottom=(el.scrollTop+el.clientHeight)>=(el.scrollHeight-2); if (data.data && data.data.length) { el.textContent += data.data; } logOffset = data.offset||logOffset; if (followTail && (atBottom || el.textContent.length===0)) { el.scrollTop=el.scrollHeight; } }
     function onLogsScroll() { const el = document.getElementById('logs'); const atBottom=(el.scrollTop+el.clientHeight)>=(el.scrollHeight-2); followTail = atBottom; }
 
-    window.addEventListener('DOMContentLoaded', () => { loadConfig(); refreshService(); });
+    // One Server-Sent Events stream carries stats, service state and, while shown, new log lines
+    let events = null;
+    function connectEvents() {
+      if (events) events.close();
+      events = new EventSource('/api/events' + (logsShown ? `?logs=1&offset=${logOffset}` : ''));
+      events.onmessage = (e) => {
+        const f = JSON.parse(e.data);
+        if (f.stats) updateStats(f.stats);
+        updateService(f.service);
+        // Unsent local edits win; the server's config follows once they're applied
+        if (f.config && !flushTimer && !Object.keys(pendingOps).length) { config = f.config; render(); }
+        if (f.log) appendLog(f.log);
+      };
+      // Reconnect ourselves so the log offset is current rather than the one in the original URL
+      events.onerror = () => { events.close(); events = null; setTimeout(() => { if (!events) connectEvents(); }, 2000); };
+    }
+
+    // Changes made elsewhere (e.g. in the TUI) arrive on the event stream, which resends the config on reconnect
+    window.addEventListener('DOMContentLoaded', () => { loadConfig(); connectEvents(); connectWs(); });
 
     // --- Stats ---
     function clamp(x, lo, hi) { return Math.max(lo, Math.min(hi, x)); }
@@ -335,21 +729,23 @@ HTML = """
       return `${Math.round(bytesPerSec||0)} B/s`;
     }
 
-    async function loadStats() {
+    function updateStats(stats) {
       try {
-        const r = await fetch('/api/stats');
-        const stats = await r.json();
         const now = Date.now() / 1000;
         // Update history (30s window)
         statsHist.push({ t: now, in: stats.input_bytes||0, out: stats.output_bytes||0, proc: stats.processed_secs||0 });
-        // prune
+        // prune by advancing the head, dropping the stale prefix in one splice now and then
         const cutoff = now - 30.0;
-        while (statsHist.length && statsHist[0].t < cutoff) statsHist.shift();
+        while (statsHead < statsHist.length && statsHist[statsHead].t < cutoff) statsHead++;
+        if (statsHead > 64) {
+          statsHist.splice(0, statsHead);
+          statsHead = 0;
+        }
 
         let inBps = 0, outBps = 0, rtf = 0;
-        if (statsHist.length >= 2) {
+        if (statsHist.length - statsHead >= 2) {
           const last = statsHist[statsHist.length-1];
-          let j = 0;
+          let j = statsHead;
           while (j < statsHist.length-1) {
             if ((last.in - statsHist[j].in) > 0 || (last.out - statsHist[j].out) > 0) break;
             j++;
@@ -401,7 +797,6 @@ HTML = """
         // ignore
       }
     }
-    setInterval(loadStats, 1000);
   </script>
   </head>
   <body>
@@ -439,22 +834,7 @@ HTML = """
       <div class="section">
         <h2>Volume Controls</h2>
         <div class="stems">
-          <div>
-            <div class="row"><label>Drums</label><input id="gain_0" type="range" min="0" max="200" step="1" oninput="onGainChange(0, this.value)"/><div id="gain_label_0">100%</div></div>
-            <div class="buttons"><button id="mute_0" onclick="onMute(0)">Mute</button><button id="solo_0" onclick="onSolo(0)">Solo</button></div>
-          </div>
-          <div>
-            <div class="row"><label>Bass</label><input id="gain_1" type="range" min="0" max="200" step="1" oninput="onGainChange(1, this.value)"/><div id="gain_label_1">100%</div></div>
-            <div class="buttons"><button id="mute_1" onclick="onMute(1)">Mute</button><button id="solo_1" onclick="onSolo(1)">Solo</button></div>
-          </div>
-          <div>
-            <div class="row"><label>Vocals</label><input id="gain_2" type="range" min="0" max="200" step="1" oninput="onGainChange(2, this.value)"/><div id="gain_label_2">100%</div></div>
-            <div class="buttons"><button id="mute_2" onclick="onMute(2)">Mute</button><button id="solo_2" onclick="onSolo(2)">Solo</button></div>
-          </div>
-          <div>
-            <div class="row"><label>Other</label><input id="gain_3" type="range" min="0" max="200" step="1" oninput="onGainChange(3, this.value)"/><div id="gain_label_3">100%</div></div>
-            <div class="buttons"><button id="mute_3" onclick="onMute(3)">Mute</button><button id="solo_3" onclick="onSolo(3)">Solo</button></div>
-          </div>
+{{STEM_ROWS}}
         </div>
         <div class="row"><button class="primary" onclick="resetVolumes()">Reset All Volumes</button></div>
       </div>
@@ -484,23 +864,96 @@ HTML = """
   </html>
 """
 
+_STEM_NAMES = ("Drums", "Bass", "Vocals", "Other")
+_STEM_ROW_TEMPLATE = """\
+          <div>
+            <div class="row"><label>{name}</label><input id="gain_{i}" type="range" min="0" max="200" step="1" oninput="onGainChange({i}, this.value)"/><div id="gain_label_{i}">100%</div></div>
+            <div class="buttons"><button id="mute_{i}" onclick="onMute({i})">Mute</button><button id="solo_{i}" onclick="onSolo({i})">Solo</button></div>
+          </div>"""
+# The page's CSS/JS is full of braces, so the rows go in via a placeholder rather than format()
+HTML = HTML.replace("{{STEM_ROWS}}", "\n".join(
+    _STEM_ROW_TEMPLATE.format(i=i, name=name) for i, name in enumerate(_STEM_NAMES)))
+
+# The page never changes at runtime, so encode and compress it once
+HTML_BYTES = HTML.encode("utf-8")
+HTML_GZIP = gzip.compress(HTML_BYTES, 9)
+HTML_ETAG = f'"{hashlib.md5(HTML_BYTES).hexdigest()}"'
+# Revalidate on each load so a new version is picked up, but answer repeats with a 304
+_HTML_HEADERS = {"ETag": HTML_ETAG, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+_HTML_GZIP_HEADERS = {**_HTML_HEADERS, "Content-Encoding": "gzip"}
+
 
 async def index(request: Request):
-    return HTMLResponse(HTML)
+    if request.headers.get("if-none-match") == HTML_ETAG:
+        return Response(status_code=304, headers=_HTML_HEADERS)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(HTML_GZIP, media_type="text/html", headers=_HTML_GZIP_HEADERS)
+    return Response(HTML_BYTES, media_type="text/html", headers=_HTML_HEADERS)
+
+
+@contextlib.asynccontextmanager
+async def _lifespan(app):
+    yield
+    # Don't lose a debounced change on shutdown
+    if _save_handle is not None:
+        _flush_save()
 
 
 def make_app() -> Starlette:
-    return Starlette(routes=[
+    return Starlette(lifespan=_lifespan, routes=[
         Route("/", index),
         Route("/api/config", get_config),
         Route("/api/update", update_config, methods=["POST"]),
+        WebSocketRoute("/ws", ws_updates),
         Route("/api/stats", get_stats),
         Route("/api/service/status", service_status),
         Route("/api/service", service_action, methods=["POST"]),
         Route("/api/logs", get_logs),
+        Route("/api/logs/raw", get_logs_raw),
+        Route("/api/events", events),
     ])
 
 
+def _open_browser(url):
+    print(f"Web UI available at {url}")
+    # Open default browser if allowed
+    try:
+        if os.environ.get("PAL_UI_OPEN", "1") == "0":
+            return
+        xdg_open = shutil.which("xdg-open")
+        if xdg_open is not None and "BROWSER" not in os.environ:
+            # Spawn xdg-open directly rather than via webbrowser's backend probing and Popen
+            pid = os.posix_spawn(xdg_open, [xdg_open, url], os.environ)
+            threading.Thread(target=os.waitpid, args=(pid, 0), daemon=True).start()
+        else:
+            import webbrowser
+            webbrowser.open(url)
+    except Exception:
+        pass
+
+
+class _Server(uvicorn.Server):
+    """uvicorn.Server that signals once startup has finished, so callers can wait instead of polling."""
+
+    def __init__(self, config: uvicorn.Config):
+        super().__init__(config)
+        # Set after startup whether or not it succeeded; check .started for the outcome
+        self.startup_done = threading.Event()
+
+    async def startup(self, sockets=None):
+        try:
+            await super().startup(sockets=sockets)
+        finally:
+            self.startup_done.set()
+
+    def run(self, sockets=None):
+        try:
+            super().run(sockets=sockets)
+        finally:
+            # Also release waiters if the server exits before reaching startup
+            self.startup_done.set()
+
+
 class StreamSeparatorWebGUI:
     def __init__(self):
         self.app = make_app()
@@ -510,37 +963,52 @@ class StreamSeparatorWebGUI:
         port = int(os.environ.get("PAL_UI_PORT", "8765"))
         url = f"http://{host}:{port}"
 
-        # Start server in a background thread
-        config = uvicorn.Config(self.app, host=host, port=port, log_level="info")
-        server = uvicorn.Server(config)
+        # Slider drags send many small requests, so skip per-request access logs and
+        # optional headers; the loop/parser stay "auto" so uvloop/httptools are used if installed
+        config = uvicorn.Config(
+            self.app, host=host, port=port,
+            log_level="warning", access_log=False,
+            server_header=False, date_header=False)
+        server = _Server(config)
+        global _server
+        _server = server
 
-        def serve():
+        try:
+            import webview  # type: ignore
+        except ImportError:
+            webview = None
+
+        if webview is None:
+            # No native window to host, so serve on the main thread and let uvicorn handle Ctrl-C;
+            # the browser is opened from a helper thread once the server is listening
+            def open_when_started():
+                server.startup_done.wait(timeout=5.0)
+                if server.started:
+                    _open_browser(url)
+
+            threading.Thread(target=open_when_started, daemon=True).start()
             server.run()
+            return
 
-        t = threading.Thread(target=serve, daemon=True)
+        # pywebview needs the main thread, so the server runs in a background thread
+        t = threading.Thread(target=server.run, daemon=True)
         t.start()
 
-        # Give server a moment to bind
-        time.sleep(0.3)
+        # Wait until the server is listening (or has failed to start) rather than a fixed delay
+        server.startup_done.wait(timeout=5.0)
 
-        # Try to open a native window via pywebview if available; fallback to browser
         try:
-            import webview  # type: ignore
             window_title = os.environ.get("PAL_UI_TITLE", "Stream Separator Configuration")
             webview.create_window(window_title, url)
             print(f"Web UI available in native window at {url}")
             webview.start()
         except Exception:
-            print(f"Web UI available at {url}")
-            # Open default browser if allowed
+            # e.g. no display or GUI backend; fall back to the browser
+            _open_browser(url)
+            # Keep process alive while server runs, blocking rather than polling
             try:
-                if os.environ.get("PAL_UI_OPEN", "1") != "0":
-                    webbrowser.open(url)
-            except Exception:
-                pass
-            # Keep process alive while server runs
-            try:
-                while t.is_alive():
-                    time.sleep(0.5)
+                t.join()
             except KeyboardInterrupt:
-                pass
+                server.should_exit = True
+                t.join(timeout=2.0)
+
@@ -0,0 +1,74 @@
+import os
+import random
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+sf = pytest.importorskip("soundfile")
+pytest.importorskip("hs_tasnet")
+
+from hs_tasnet import MusDB18HQ
+from pal_stem_separator.train import MaxMusDB18HQ
+
+SAMPLE_RATE = 44100
+STEMS = ('drums', 'bass', 'vocals', 'other')
+
+def write_track(track_dir, seed=0):
+    """Write a one-second MUSDB18-HQ style track of 16-bit stereo noise."""
+    os.makedirs(track_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    stems = [rng.integers(-8000, 8000, (SAMPLE_RATE, 2), dtype=np.int16) for _ in STEMS]
+    for name, data in zip(STEMS, stems):
+        sf.write(f"{track_dir}/{name}.wav", data, SAMPLE_RATE, subtype='PCM_16')
+    sf.write(f"{track_dir}/mixture.wav", sum(s.astype(np.int32) for s in stems).clip(-32768, 32767).astype(np.int16), SAMPLE_RATE, subtype='PCM_16')
+
+def seeded_item(dataset, idx=0, seed=0):
+    # Same seeds for both loaders so any crop they draw lines up
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    return dataset[idx]
+
+def assert_same_item(actual, expected):
+    (audio, targets), (expected_audio, expected_targets) = actual, expected
+    assert audio.dtype == expected_audio.dtype
+    assert targets.dtype == expected_targets.dtype
+    assert audio.shape == expected_audio.shape
+    assert targets.shape == expected_targets.shape
+    torch.testing.assert_close(audio, expected_audio, rtol=0, atol=1e-4)
+    torch.testing.assert_close(targets, expected_targets, rtol=0, atol=1e-4)
+
+@pytest.fixture
+def dataset_path(tmp_path):
+    write_track(tmp_path / "train" / "track")
+    return str(tmp_path)
+
+@pytest.fixture
+def upstream(dataset_path):
+    dataset = MusDB18HQ(dataset_path, sep_filenames=STEMS)
+    assert len(dataset.paths) == 1
+    return dataset
+
+def test_item_matches_upstream(dataset_path, upstream):
+    dataset = MaxMusDB18HQ(dataset_path, sep_filenames=STEMS, paths=upstream.paths)
+    assert_same_item(seeded_item(dataset), seeded_item(upstream))
+
+def test_cached_item_matches_upstream(dataset_path, upstream, tmp_path):
+    dataset = MaxMusDB18HQ(dataset_path, sep_filenames=STEMS, paths=upstream.paths, cache_dir=str(tmp_path / "cache"))
+    assert_same_item(seeded_item(dataset), seeded_item(upstream))
+
+def test_edited_stem_invalidates_cache(dataset_path, upstream, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    MaxMusDB18HQ(dataset_path, sep_filenames=STEMS, paths=upstream.paths, cache_dir=cache_dir)
+
+    # Rewrite only the vocals; the mixture is untouched
+    vocals_path = f"{upstream.paths[0]}/vocals.wav"
+    sf.write(vocals_path, np.zeros((SAMPLE_RATE, 2), dtype=np.int16), SAMPLE_RATE, subtype='PCM_16')
+    stat = os.stat(vocals_path)
+    os.utime(vocals_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    dataset = MaxMusDB18HQ(dataset_path, sep_filenames=STEMS, paths=upstream.paths, cache_dir=cache_dir)
+    _, targets = seeded_item(dataset)
+    assert not targets[STEMS.index('vocals')].any()
+    assert_same_item(seeded_item(dataset), seeded_item(MusDB18HQ(dataset_path, sep_filenames=STEMS)))